@@ -1,11 +1,27 @@
+import time
+STARTUP_T0 = time.perf_counter()
+
 import tkinter as tk
-from tkinter import ttk
-import mss
-from PIL import Image, ImageTk
-import keyboard
+from PIL import Image
 import json
 import os
+import sys
 import ctypes
+import threading
+import zlib
+import statistics
+import heapq
+import struct
+import bisect
+import random
+import base64
+import importlib.util
+from collections import namedtuple, deque
+
+try:
+    import winsound
+except ImportError:
+    winsound = None
 
 try:
     ctypes.windll.shcore.SetProcessDpiAwareness(1)
@@ -13,17 +29,2554 @@ except:
     pass
 
 SETTINGS_FILE = "Zoom_settings.json"
+TRIGGER_LOG = "Zoom_alerts.log"
+STARTUP_LOG = "Zoom_startup.log"
+OVERLAY_TEXT_OFFSETS = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
 
-class BuffMirrorApp:
+LAZY_IMPORTS = []  # (name, seconds) in load order, for --profile-startup
+
+
+class LazyModule:
+    # Stands in for a module that is not needed to get the first frame on
+    # screen. The first attribute access imports it through `loader` (a
+    # plain import statement, so freezers still bundle it) and replaces the
+    # placeholder in this module's globals.
+    def __init__(self, alias, loader):
+        self._alias = alias
+        self._loader = loader
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            t0 = time.perf_counter()
+            self._module = self._loader()
+            LAZY_IMPORTS.append((self._alias, time.perf_counter() - t0))
+            globals()[self._alias] = self._module
+        return getattr(self._module, attr)
+
+
+def _import_mss():
+    import mss
+    return mss
+
+
+def _import_keyboard():
+    import keyboard
+    return keyboard
+
+
+def _import_imagetk():
+    from PIL import ImageTk
+    return ImageTk
+
+
+def _import_ttk():
+    from tkinter import ttk
+    return ttk
+
+
+def _import_filedialog():
+    from tkinter import filedialog
+    return filedialog
+
+
+def _import_multiprocessing():
+    import multiprocessing
+    return multiprocessing
+
+
+def _import_shared_memory():
+    from multiprocessing import shared_memory
+    return shared_memory
+
+
+def _import_numpy():
+    import numpy
+    return numpy
+
+
+mss = LazyModule('mss', _import_mss)
+keyboard = LazyModule('keyboard', _import_keyboard)
+ImageTk = LazyModule('ImageTk', _import_imagetk)
+ttk = LazyModule('ttk', _import_ttk)
+filedialog = LazyModule('filedialog', _import_filedialog)
+multiprocessing = LazyModule('multiprocessing', _import_multiprocessing)
+shared_memory = LazyModule('shared_memory', _import_shared_memory)
+# optional: None when missing, otherwise loaded by the first feature using it
+np = LazyModule('np', _import_numpy) if importlib.util.find_spec("numpy") is not None else None
+
+# Fixed cost of one grab() call expressed in pixels, so it can be weighed
+# against the extra (wasted) pixels copied when regions share a bounding box.
+CAPTURE_CALL_COST_PX = 60000
+
+
+class CaptureSlice:
+    __slots__ = ('buf', 'offset', 'stride', 'width', 'height')
+
+    def __init__(self, buf, offset, stride, width, height):
+        self.buf = buf
+        self.offset = offset
+        self.stride = stride
+        self.width = width
+        self.height = height
+
+    @property
+    def size(self):
+        return (self.width, self.height)
+
+    def to_image(self):
+        view = memoryview(self.buf)[self.offset:]
+        return Image.frombuffer("RGB", self.size, view, "raw", "BGRX", self.stride, 1)
+
+    def tobytes(self):
+        # tightly packed BGRA rows
+        view = memoryview(self.buf)
+        row = self.width * 4
+        if self.stride == row:
+            return bytes(view[self.offset:self.offset + row * self.height])
+        return b"".join(view[self.offset + y * self.stride:self.offset + y * self.stride + row] for y in range(self.height))
+
+
+def rect_union(a, b):
+    left = min(a[0], b[0])
+    top = min(a[1], b[1])
+    right = max(a[0] + a[2], b[0] + b[2])
+    bottom = max(a[1] + a[3], b[1] + b[3])
+    return (left, top, right - left, bottom - top)
+
+
+def monitor_index_for(rect, monitors):
+    cx = rect[0] + rect[2] // 2
+    cy = rect[1] + rect[3] // 2
+    for i, m in enumerate(monitors):
+        if m['left'] <= cx < m['left'] + m['width'] and m['top'] <= cy < m['top'] + m['height']:
+            return i
+    return -1
+
+
+def plan_capture(rects, monitors=(), call_cost=CAPTURE_CALL_COST_PX):
+    # Greedy agglomerative grouping: keep merging the pair of groups whose
+    # combined bounding box is cheaper than grabbing both separately.
+    # cost(group) = call_cost + area(bbox). Groups never span monitors.
+    by_monitor = {}
+    for i, r in enumerate(rects):
+        if r[2] <= 0 or r[3] <= 0: continue
+        by_monitor.setdefault(monitor_index_for(r, monitors), []).append(([i], r))
+
+    plan = []
+    for groups in by_monitor.values():
+        while len(groups) > 1:
+            best = None
+            for a in range(len(groups)):
+                ra = groups[a][1]
+                for b in range(a + 1, len(groups)):
+                    rb = groups[b][1]
+                    u = rect_union(ra, rb)
+                    saving = call_cost + ra[2] * ra[3] + rb[2] * rb[3] - u[2] * u[3]
+                    if saving > 0 and (best is None or saving > best[0]):
+                        best = (saving, a, b, u)
+            if best is None: break
+            _, a, b, u = best
+            merged = (groups[a][0] + groups[b][0], u)
+            groups[b] = merged
+            del groups[a]
+        for members, bbox in groups:
+            plan.append((bbox, sorted(members)))
+    return plan
+
+
+class RawShot:
+    # The part of mss.ScreenShot the pipeline uses: BGRA bytes plus size.
+    __slots__ = ('raw', 'size')
+
+    def __init__(self, raw, size):
+        self.raw = raw
+        self.size = size
+
+
+class CaptureSource:
+    # Anything with mss-style `monitors` and `grab(monitor_dict)`. Sources are
+    # opened on the thread that uses them.
+    name = "base"
+
+    def __init__(self):
+        self.monitors = []
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def grab(self, monitor):
+        raise NotImplementedError
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MssSource(CaptureSource):
+    name = "mss"
+
+    def open(self):
+        self.sct = mss.mss()
+        self.monitors = self.sct.monitors
+
+    def close(self):
+        self.sct.close()
+
+    def grab(self, monitor):
+        return self.sct.grab(monitor)
+
+
+def virtual_monitors(width, height, left=0, top=0):
+    mon = {'left': left, 'top': top, 'width': width, 'height': height}
+    return [dict(mon), dict(mon)]
+
+
+class SyntheticSource(CaptureSource):
+    # Deterministic animated test patterns on a virtual monitor. Pixels are a
+    # function of screen position and frame number, so coalesced and
+    # per-region grabs see the same image (noise repeats every monitor width). The frame advances
+    # `change_rate` times per second (0 = static).
+    name = "synthetic"
+    PATTERNS = ("bars", "checker", "noise")
+
+    def __init__(self, change_rate=5.0, pattern="bars", width=1920, height=1080, clock=time.perf_counter):
+        super().__init__()
+        if pattern not in self.PATTERNS:
+            raise ValueError(f"unknown pattern {pattern!r}")
+        self.change_rate = change_rate
+        self.pattern = pattern
+        self.clock = clock
+        self.monitors = virtual_monitors(width, height)
+        if pattern == "bars":
+            self._period = 256
+            self._tile = b"".join(bytes((i, (i * 3) & 255, 255 - i, 255)) for i in range(256))
+        else:
+            self._period = 32
+            self._tile = b"\x20\x20\x20\xff" * 16 + b"\xe0\xe0\xe0\xff" * 16
+        self._cycles = {}
+        self._noise_frame = None
+        self._noise_rows = {}
+
+    def frame_index(self):
+        return int(self.clock() * self.change_rate) if self.change_rate > 0 else 0
+
+    def _cycle(self, width):
+        # enough repeats of the tile to slice any row of `width` pixels
+        cyc = self._cycles.get(width)
+        if cyc is None:
+            cyc = self._tile * (width // self._period + 2)
+            self._cycles[width] = cyc
+        return cyc
+
+    def grab(self, monitor):
+        left, top = monitor['left'], monitor['top']
+        width, height = monitor['width'], monitor['height']
+        frame = self.frame_index()
+        if self.pattern == "noise":
+            return RawShot(bytearray(b"".join(self._noise_row(frame, y, left, width) for y in range(top, top + height))),
+                           (width, height))
+
+        cyc = self._cycle(width)
+        period = self._period
+        rows = []
+        for y in range(top, top + height):
+            if self.pattern == "bars":
+                start = (left + y + frame * 8) % period
+            else:
+                start = (left + 16 * ((y // 16 + frame) & 1)) % period
+            rows.append(cyc[start * 4:(start + width) * 4])
+        return RawShot(bytearray(b"".join(rows)), (width, height))
+
+    def _noise_row(self, frame, y, left, width):
+        # one row of noise per frame and screen row, monitor wide and
+        # repeating past it, so every grab of a pixel sees the same bytes
+        if frame != self._noise_frame:
+            self._noise_frame = frame
+            self._noise_rows = {}
+        mon = self.monitors[1]
+        span = mon['width']
+        row = self._noise_rows.get(y)
+        if row is None:
+            row = random.Random(f"{frame}:{y}").randbytes(span * 4)
+            self._noise_rows[y] = row
+        start = (left - mon['left']) % span
+        cyc = row * ((start + width) // span + 1)
+        return cyc[start * 4:(start + width) * 4]
+
+
+# Replay files: magic line, one JSON header line, then records of
+# (kind, timestamp, payload length) + zlib payload. Kind b'K' is a full BGRA
+# keyframe, b'D' is the XOR against the previous frame.
+REPLAY_MAGIC = b"BBZR1\n"
+REPLAY_RECORD = struct.Struct("<cdI")
+
+
+def xor_bytes(a, b):
+    return (int.from_bytes(a, 'little') ^ int.from_bytes(b, 'little')).to_bytes(len(a), 'little')
+
+
+class ReplayWriter:
+    def __init__(self, path, rect, fps=30, keyframe_interval=30):
+        self.rect = rect
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.frames = 0
+        self._prev = None
+        self._file = open(path, 'wb')
+        left, top, width, height = rect
+        header = {'left': left, 'top': top, 'width': width, 'height': height, 'fps': fps}
+        self._file.write(REPLAY_MAGIC + json.dumps(header).encode() + b"\n")
+
+    def write_frame(self, raw, timestamp):
+        raw = bytes(raw)
+        if self._prev is None or self.frames % self.keyframe_interval == 0:
+            self.write_record(b'K', timestamp, zlib.compress(raw, 1))
+        else:
+            self.write_record(b'D', timestamp, zlib.compress(xor_bytes(raw, self._prev), 1))
+        self._prev = raw
+
+    def write_record(self, kind, timestamp, payload):
+        self._file.write(REPLAY_RECORD.pack(kind, timestamp, len(payload)))
+        self._file.write(payload)
+        self.frames += 1
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_replay(path):
+    with open(path, 'rb') as f:
+        if f.readline() != REPLAY_MAGIC:
+            raise ValueError(f"{path} is not a replay file")
+        header = json.loads(f.readline())
+        records = []
+        while True:
+            head = f.read(REPLAY_RECORD.size)
+            if len(head) < REPLAY_RECORD.size: break
+            kind, timestamp, length = REPLAY_RECORD.unpack(head)
+            records.append((kind, timestamp, f.read(length)))
+    if not records or records[0][0] != b'K':
+        raise ValueError(f"{path} has no leading keyframe")
+    return header, records
+
+
+def record_replay(source, rect, path, frames, fps=30):
+    # grabs `frames` frames of `rect` from an opened source at `fps`
+    left, top, width, height = rect
+    with ReplayWriter(path, rect, fps) as writer:
+        start = time.perf_counter()
+        for i in range(frames):
+            shot = source.grab({'left': left, 'top': top, 'width': width, 'height': height})
+            writer.write_frame(shot.raw, time.perf_counter() - start)
+            time.sleep(max(0.0, start + (i + 1) / fps - time.perf_counter()))
+    return path
+
+
+class ReplaySource(CaptureSource):
+    # Plays a replay file back in (scaled) real time, looping at the end.
+    # Grabs outside the recorded rectangle come back black.
+    name = "replay"
+
+    def __init__(self, path, loop=True, speed=1.0, clock=time.perf_counter):
+        super().__init__()
+        self.path = path
+        self.loop = loop
+        self.speed = speed
+        self.clock = clock
+        self.header, self.records = read_replay(path)
+        h = self.header
+        self.monitors = virtual_monitors(h['width'], h['height'], h['left'], h['top'])
+        first = self.records[0][1]
+        self._times = [ts - first for _, ts, _ in self.records]
+        self._duration = self._times[-1] + 1.0 / max(1, h.get('fps', 30))
+        self._keyframes = [i for i, (kind, _, _) in enumerate(self.records) if kind == b'K']
+        self._index = -1
+        self._raw = None
+        self._start = None
+
+    def open(self):
+        self._start = self.clock()
+
+    def frame_at(self, index):
+        # jump to the closest keyframe at or before index when going back or
+        # skipping ahead past one, then apply deltas forward
+        key = self._keyframes[bisect.bisect_right(self._keyframes, index) - 1]
+        if index < self._index or key > self._index:
+            self._index = key
+            self._raw = zlib.decompress(self.records[key][2])
+        while self._index < index:
+            self._index += 1
+            kind, _, payload = self.records[self._index]
+            data = zlib.decompress(payload)
+            self._raw = data if kind == b'K' else xor_bytes(data, self._raw)
+        return self._raw
+
+    def current_index(self):
+        if self._start is None:
+            self._start = self.clock()
+        elapsed = (self.clock() - self._start) * self.speed
+        if self.loop:
+            elapsed %= self._duration
+        return max(0, bisect.bisect_right(self._times, elapsed) - 1)
+
+    def grab(self, monitor):
+        raw = self.frame_at(self.current_index())
+        h = self.header
+        src_w = h['width']
+        width, height = monitor['width'], monitor['height']
+        x0 = monitor['left'] - h['left']
+        y0 = monitor['top'] - h['top']
+        # clip the requested columns to the recording, pad the rest black
+        cx0, cx1 = max(0, x0), min(src_w, x0 + width)
+        pad_left = b"\0" * (max(0, cx0 - x0) * 4)
+        pad_right = b"\0" * (max(0, x0 + width - max(cx1, cx0)) * 4)
+        blank = b"\0" * (width * 4)
+        rows = []
+        for y in range(y0, y0 + height):
+            if 0 <= y < h['height'] and cx0 < cx1:
+                start = (y * src_w + cx0) * 4
+                rows.append(pad_left + raw[start:start + (cx1 - cx0) * 4] + pad_right)
+            else:
+                rows.append(blank)
+        return RawShot(bytearray(b"".join(rows)), (width, height))
+
+
+class BatchedCapture:
+    def __init__(self, source, monitors=(), call_cost=CAPTURE_CALL_COST_PX):
+        self.source = source
+        self.monitors = monitors
+        self.call_cost = call_cost
+        self.grab_calls = 0
+        self._plan_key = None
+        self._plan = None
+
+    def get_plan(self, rects, coalesce=True):
+        # planned over every region, not just the ones due this tick, so the
+        # plan only changes when the layout does
+        key = (tuple(rects), coalesce)
+        if key != self._plan_key:
+            if coalesce:
+                self._plan = plan_capture(rects, self.monitors, self.call_cost)
+            else:
+                self._plan = [(r, [i]) for i, r in enumerate(rects) if r[2] > 0 and r[3] > 0]
+            self._plan_key = key
+        return self._plan
+
+    def grab(self, rects, coalesce=True, wanted=None):
+        # rects are (left, top, width, height) in global screen coordinates.
+        # Returns one CaptureSlice per rect (None for empty rects and rects
+        # not in `wanted`), all pointing into the shared buffer of their
+        # group's grab. A group with only some members wanted grabs just the
+        # bounding box of those.
+        slices = [None] * len(rects)
+        for bbox, members in self.get_plan(rects, coalesce):
+            if wanted is not None:
+                due = [i for i in members if i in wanted]
+                if not due: continue
+                if len(due) < len(members):
+                    bbox = rects[due[0]]
+                    for i in due[1:]:
+                        bbox = rect_union(bbox, rects[i])
+                    members = due
+            bl, bt, bw, bh = bbox
+            shot = self.source.grab({'left': bl, 'top': bt, 'width': bw, 'height': bh})
+            self.grab_calls += 1
+            buf = shot.raw
+            stride = bw * 4
+            for i in members:
+                l, t, w, h = rects[i]
+                offset = (t - bt) * stride + (l - bl) * 4
+                slices[i] = CaptureSlice(buf, offset, stride, w, h)
+        return slices
+
+
+class ChangeDetector:
+    # Per-region signature of the raw BGRA rows: a crc32 for every
+    # `sample_step`-th row. A region counts as changed when more than
+    # `threshold` (0..1) of the sampled rows differ from the previous grab.
+    def __init__(self, threshold=0.0, sample_step=1):
+        self.threshold = threshold
+        self.sample_step = max(1, sample_step)
+        self.signatures = {}
+        self.checked = {}
+        self.skipped = {}
+
+    def reset(self):
+        self.signatures.clear()
+
+    def forget(self, keep_ids):
+        # swapped whole, the capture thread may be using the old ones
+        self.signatures = {k: v for k, v in self.signatures.items() if k in keep_ids}
+        self.checked = {k: v for k, v in self.checked.items() if k in keep_ids}
+        self.skipped = {k: v for k, v in self.skipped.items() if k in keep_ids}
+
+    def signature(self, slc):
+        view = memoryview(slc.buf)
+        row_len = slc.width * 4
+        sig = []
+        for y in range(0, slc.height, self.sample_step):
+            start = slc.offset + y * slc.stride
+            sig.append(zlib.crc32(view[start:start + row_len]))
+        return sig
+
+    def changed(self, key, slc):
+        sig = self.signature(slc)
+        prev = self.signatures.get(key)
+        self.signatures[key] = sig
+        self.checked[key] = self.checked.get(key, 0) + 1
+        if prev is None or len(prev) != len(sig):
+            return True
+        diff = 0
+        for a, b in zip(prev, sig):
+            if a != b: diff += 1
+        if diff > self.threshold * len(sig):
+            return True
+        self.skipped[key] = self.skipped.get(key, 0) + 1
+        return False
+
+    def skip_rate(self):
+        checked = sum(self.checked.values())
+        return sum(self.skipped.values()) / checked if checked else 0.0
+
+
+# Trigger rules look at SIGNATURE_STEP x SIGNATURE_STEP box-filtered cells of
+# the raw grab; rule rects are given in region pixels.
+SIGNATURE_STEP = 4
+
+
+class Signature:
+    # Downsampled RGB copy of one grab; the int16 arrays the rules compare
+    # are made on first use and shared by every rule of the region. Colour
+    # is kept as (3, rows, cols) planes so comparisons run on whole rows.
+    __slots__ = ('image', '_planes', '_gray', '_boxes')
+
+    def __init__(self, slc, step=SIGNATURE_STEP):
+        self.image = slc.to_image().reduce(step)
+        self._planes = None
+        self._gray = None
+        self._boxes = None
+
+    def planes(self):
+        if self._planes is None:
+            self._planes = np.asarray(self.image).transpose(2, 0, 1).astype(np.int16, order='C')
+        return self._planes
+
+    def gray(self):
+        if self._gray is None:
+            self._gray = np.asarray(self.image.convert("L")).astype(np.int16)
+        return self._gray
+
+    def boxes(self):
+        # gray cells summed over the 2x2 box starting at every cell
+        if self._boxes is None:
+            g = self.gray()
+            boxes = g[:-1, :-1] + g[1:, :-1]
+            boxes += g[:-1, 1:]
+            boxes += g[1:, 1:]
+            self._boxes = boxes
+        return self._boxes
+
+
+def halve_cells(cells):
+    h, w = cells.shape[0] // 2 * 2, cells.shape[1] // 2 * 2
+    rows = cells[0:h:2] + cells[1:h:2]
+    return np.ascontiguousarray(rows[:, 0:w:2] + rows[:, 1:w:2])
+
+
+def template_sad(cells, tmpl, positions, step=1):
+    # Sum of absolute differences of tmpl at (rows, cols) positions of
+    # C-contiguous `cells`, template cells `step` apart. Laid out template
+    # cell major, so the sum runs over whole rows of positions.
+    th, tw = tmpl.shape
+    s0, s1 = cells.strides
+    win = np.ndarray((th, tw) + positions, cells.dtype, cells, 0, (step * s0, step * s1, s0, s1))
+    diff = np.subtract(win, tmpl[:, :, None, None], order='C')
+    np.abs(diff, out=diff)
+    return diff.reshape(tmpl.size, -1).sum(axis=0, dtype=np.int32)
+
+
+def encode_cells(cells):
+    return {'shape': list(cells.shape), 'data': base64.b64encode(cells.astype(np.uint8).tobytes()).decode('ascii')}
+
+
+def decode_cells(data):
+    raw = base64.b64decode(data['data'])
+    return np.frombuffer(raw, np.uint8).reshape(data['shape']).astype(np.int16)
+
+
+class TriggerRule:
+    # One alert rule, compiled from the dict saved with its region:
+    #   diff      `rect` differs from its snapshot by a mean >= threshold (0-1)
+    #   color     a share >= threshold of `rect` is within `tolerance` of `color`
+    #   template  the (gray) snapshot of `rect` shows up anywhere in the region
+    #             with a mean difference <= threshold
+    # `invert` negates the condition. The action fires when it becomes true.
+    #
+    # Templates are first compared 2x2-summed against the region's box sums,
+    # a quarter of the work. That difference is a lower bound of the full
+    # one, so only positions it leaves under the limit are compared in full
+    # and no match is missed. Small searches (up to TEMPLATE_DIRECT_CELLS
+    # cell differences) and regions that are mostly candidates skip it.
+    KINDS = ('diff', 'color', 'template')
+    ACTIONS = ('sound', 'flash', 'log')
+    TEMPLATE_DIRECT_CELLS = 4096
+
+    def __init__(self, data):
+        self.kind = data.get('kind', 'diff')
+        self.action = data.get('action', 'log')
+        self.name = data.get('name') or self.kind
+        self.invert = bool(data.get('invert', False))
+        self.threshold = float(data.get('threshold', 0.1))
+        self.tolerance = int(data.get('tolerance', 32))
+        self.rect = data.get('rect')
+        color = data.get('color', '#ffffff').lstrip('#')
+        self.color = np.array([int(color[i:i + 2], 16) for i in (0, 2, 4)], np.int16)
+        self.snapshot = decode_cells(data['snapshot']) if data.get('snapshot') else None
+        self.coarse = None
+        self._offsets = None  # (cells width, flat template cell offsets)
+        if self.kind == 'template' and self.snapshot is not None and min(self.snapshot.shape) >= 2:
+            self.coarse = halve_cells(self.snapshot)
+        self.active = None  # unknown until the first evaluation
+
+    def cells_rect(self):
+        x, y, w, h = self.rect
+        top, left = y // SIGNATURE_STEP, x // SIGNATURE_STEP
+        bottom = max(top + 1, (y + h) // SIGNATURE_STEP)
+        right = max(left + 1, (x + w) // SIGNATURE_STEP)
+        return top, left, bottom, right
+
+    def area(self, cells):
+        if not self.rect: return cells
+        top, left, bottom, right = self.cells_rect()
+        return cells[..., top:bottom, left:right]
+
+    def snapshot_cells(self, sig):
+        return self.area(sig.gray() if self.kind == 'template' else sig.planes())
+
+    def test(self, sig):
+        # True/False, or None when the rule can't be evaluated (no snapshot,
+        # region resized under it)
+        if self.kind == 'color':
+            area = self.area(sig.planes())
+            if not area.size: return None
+            near = np.abs(area - self.color[:, None, None]) <= self.tolerance
+            hit = np.count_nonzero(near[0] & near[1] & near[2]) >= self.threshold * near[0].size
+        elif self.kind == 'template':
+            cells, tmpl = sig.gray(), self.snapshot
+            if tmpl is None or tmpl.shape[0] > cells.shape[0] or tmpl.shape[1] > cells.shape[1]: return None
+            hit = self.find_template(sig, self.threshold * 255 * tmpl.size)
+        else:
+            area = self.area(sig.planes())
+            if self.snapshot is None or area.shape != self.snapshot.shape: return None
+            hit = np.abs(area - self.snapshot).sum() >= self.threshold * 255 * area.size
+        return bool(hit) != self.invert
+
+    def find_template(self, sig, limit):
+        # True when the template differs by <= limit somewhere in the region
+        cells, tmpl = sig.gray(), self.snapshot
+        height, width = cells.shape
+        positions = (height - tmpl.shape[0] + 1, width - tmpl.shape[1] + 1)
+        count = positions[0] * positions[1]
+        if self.coarse is None or count * tmpl.size <= self.TEMPLATE_DIRECT_CELLS:
+            return template_sad(cells, tmpl, positions).min() <= limit
+        near = np.flatnonzero(template_sad(sig.boxes(), self.coarse, positions, 2) <= limit)
+        if not near.size: return False
+        if near.size * 4 > count:
+            return template_sad(cells, tmpl, positions).min() <= limit
+        if self._offsets is None or self._offsets[0] != width:
+            th, tw = tmpl.shape
+            self._offsets = (width, (np.arange(th)[:, None] * width + np.arange(tw)).reshape(-1, 1))
+        # position index -> flat offset of its first cell
+        near += near // positions[1] * (width - positions[1])
+        win = cells.ravel().take(self._offsets[1] + near)
+        win -= tmpl.reshape(-1, 1)
+        np.abs(win, out=win)
+        return win.sum(axis=0, dtype=np.int32).min() <= limit
+
+
+class TriggerEngine:
+    # Evaluates every region's rules on the capture thread, only when the
+    # region changed (or its rules did). Fired alerts queue up in `events`
+    # as (wall time, region id, rule) for the Tk thread to act on.
+    def __init__(self):
+        self.rules = {}  # region id -> [TriggerRule]
+        self.pending = set()  # evaluate on the next grab even if unchanged
+        self.events = deque(maxlen=100)
+        self.evaluated = 0
+        self.fired = 0
+
+    def set_rules(self, region_id, rules):
+        if np is None: return
+        compiled = dict(self.rules)
+        compiled[region_id] = [TriggerRule(data) for data in rules]
+        if not compiled[region_id]:
+            del compiled[region_id]
+        # swapped whole, the capture thread may be iterating the old one
+        self.rules = compiled
+        self.pending.add(region_id)
+
+    def forget(self, keep_ids):
+        self.rules = {rid: rules for rid, rules in self.rules.items() if rid in keep_ids}
+
+    def rule_count(self):
+        return sum(len(rules) for rules in self.rules.values())
+
+    def wants(self, region_id, dirty):
+        return region_id in self.rules and (dirty or region_id in self.pending)
+
+    def update(self, region_id, slc):
+        self.pending.discard(region_id)
+        rules = self.rules.get(region_id)
+        if not rules: return
+        sig = Signature(slc)
+        for rule in rules:
+            hit = rule.test(sig)
+            self.evaluated += 1
+            if hit is None: continue
+            if hit and rule.active is False:
+                self.fired += 1
+                self.events.append((time.time(), region_id, rule))
+            rule.active = hit
+
+
+class HistoryGop:
+    # A keyframe and the XOR deltas that follow it, all for one rectangle.
+    __slots__ = ('rect', 'records', 'nbytes')
+
+    def __init__(self, rect):
+        self.rect = rect
+        self.records = []
+        self.nbytes = 0
+
+
+class FrameHistory:
+    # Recent raw (pre-zoom) BGRA frames per region for scrubbing, stored as
+    # replay records: zlib keyframes plus zlib XOR deltas. Only frames the
+    # change detector flagged are added. Whole GOPs are evicted oldest first
+    # once the compressed total exceeds `budget` bytes or falls out of
+    # `max_age` seconds.
+    def __init__(self, budget=64 * 2**20, max_age=120.0, keyframe_interval=60):
+        self.enabled = False
+        self.budget = budget
+        self.max_age = max_age
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.nbytes = 0
+        self.evicted = 0
+        self._gops = {}  # region id -> deque of HistoryGop
+        self._prev = {}  # region id -> raw bytes of the last stored frame
+        self._decoded = None  # (region id, gop, index, raw) of the last frame_at
+        self._lock = threading.Lock()
+
+    def add(self, region_id, slc, rect, timestamp):
+        raw = slc.tobytes()
+        with self._lock:
+            gops = self._gops.setdefault(region_id, deque())
+            prev = self._prev.get(region_id)
+            gop = gops[-1] if gops else None
+            if prev is None or gop is None or gop.rect != rect or len(gop.records) >= self.keyframe_interval:
+                gop = HistoryGop(rect)
+                gops.append(gop)
+                record = (b'K', timestamp, zlib.compress(raw, 1))
+            else:
+                record = (b'D', timestamp, zlib.compress(xor_bytes(raw, prev), 1))
+            gop.records.append(record)
+            gop.nbytes += len(record[2])
+            self.nbytes += len(record[2])
+            self._prev[region_id] = raw
+            self._evict(timestamp)
+
+    def _evict(self, now):
+        while True:
+            oldest = None
+            for rid, gops in self._gops.items():
+                if gops and (oldest is None or gops[0].records[0][1] < oldest[1].records[0][1]):
+                    oldest = (rid, gops[0])
+            if oldest is None: return
+            rid, gop = oldest
+            if self.nbytes <= self.budget and now - gop.records[-1][1] <= self.max_age: return
+            gops = self._gops[rid]
+            gops.popleft()
+            self.nbytes -= gop.nbytes
+            self.evicted += len(gop.records)
+            if not gops:
+                # the next frame of this region has to be a keyframe
+                del self._gops[rid]
+                self._prev.pop(rid, None)
+
+    def clear(self):
+        with self._lock:
+            self._gops = {}
+            self._prev = {}
+            self._decoded = None
+            self.nbytes = 0
+
+    def forget(self, keep_ids):
+        with self._lock:
+            for rid in [rid for rid in self._gops if rid not in keep_ids]:
+                self.nbytes -= sum(g.nbytes for g in self._gops.pop(rid))
+                self._prev.pop(rid, None)
+
+    def region_ids(self):
+        with self._lock:
+            return sorted(self._gops)
+
+    def timestamps(self, region_id):
+        with self._lock:
+            return [ts for gop in self._gops.get(region_id, ()) for _, ts, _ in gop.records]
+
+    def frame_at(self, region_id, timestamp):
+        # (rect, raw BGRA bytes, frame timestamp) of the newest frame at or
+        # before `timestamp`, or None
+        with self._lock:
+            gops = list(self._gops.get(region_id, ()))
+            if not gops or gops[0].records[0][1] > timestamp: return None
+            starts = [gop.records[0][1] for gop in gops]
+            gop = gops[bisect.bisect_right(starts, timestamp) - 1]
+            records = list(gop.records)
+            decoded = self._decoded
+        index = bisect.bisect_right([ts for _, ts, _ in records], timestamp) - 1
+        # scrubbing forward inside a GOP continues from the last decode
+        if decoded and decoded[0] == region_id and decoded[1] is gop and decoded[2] <= index:
+            pos, raw = decoded[2], decoded[3]
+        else:
+            pos, raw = 0, zlib.decompress(records[0][2])
+        for kind, _, payload in records[pos + 1:index + 1]:
+            raw = xor_bytes(zlib.decompress(payload), raw)
+        self._decoded = (region_id, gop, index, raw)
+        return gop.rect, raw, records[index][1]
+
+    def export(self, region_id, path, fps=30):
+        # writes the newest run of GOPs sharing one rectangle as a replay file
+        with self._lock:
+            gops = list(self._gops.get(region_id, ()))
+            if not gops: return 0
+            run = [gops[-1]]
+            for gop in reversed(gops[:-1]):
+                if gop.rect != run[0].rect: break
+                run.insert(0, gop)
+            records = [record for gop in run for record in gop.records]
+        with ReplayWriter(path, run[0].rect, fps) as writer:
+            for kind, ts, payload in records:
+                writer.write_record(kind, ts, payload)
+        return len(records)
+
+
+# Shared-memory output. Each region has a small fixed index block
+# "<prefix>_<region id>" (magic, generation, closed flag) that names its
+# current data block "<prefix>_<region id>_<generation>". A data block is a
+# header (magic, slot count, slot capacity, latest seq) padded to
+# SHARED_HEADER_SIZE, then `slots` slots of slot header
+# (seq begin, width, height, time.time(), seq end) + tightly packed BGRA.
+# A slot is consistent when begin == end == the seq the reader expects.
+# Growing a region moves it to a new generation instead of resizing in place.
+SHARED_MAGIC = b"BBZS"
+SHARED_INDEX = struct.Struct("<4sII")
+SHARED_BLOCK = struct.Struct("<4sIIQ")
+SHARED_SLOT = struct.Struct("<QIIdQ")
+SHARED_HEADER_SIZE = 64
+SHARED_PREFIX = "buffbarzoom"
+
+
+def shared_block_name(region_id, prefix=SHARED_PREFIX):
+    return f"{prefix}_{region_id}"
+
+
+def attach_shared_memory(name):
+    # readers must not unlink the writer's blocks when they exit
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    # before 3.13: skip registering with the resource tracker, which may be
+    # shared with the writer's process
+    from multiprocessing import resource_tracker
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+class SharedRegionBlock:
+    __slots__ = ('index', 'data', 'generation', 'capacity', 'seq')
+
+    def __init__(self, index, generation):
+        self.index = index
+        self.data = None
+        self.generation = generation
+        self.capacity = 0
+        self.seq = 0
+
+
+class SharedFrameSink:
+    # Publishes each region's latest raw grab (pre-zoom BGRA) so other local
+    # processes can read the mirrors without grabbing the screen again. Each
+    # region cycles through `slots` slots, so a reader has slots - 1 frame
+    # periods to finish with the newest one.
+    def __init__(self, prefix=SHARED_PREFIX, slots=3):
+        self.prefix = prefix
+        self.slots = max(2, slots)
+        self.published = 0
+        self.closed = False
+        self._blocks = {}  # region id -> SharedRegionBlock
+        self._lock = threading.Lock()
+
+    def _open_index(self, name):
+        try:
+            index = shared_memory.SharedMemory(name=name, create=True, size=SHARED_HEADER_SIZE)
+            generation = 0
+        except FileExistsError:
+            # left behind by an earlier run, or still held open by a reader
+            index = shared_memory.SharedMemory(name=name)
+            magic, generation, _ = SHARED_INDEX.unpack_from(index.buf, 0)
+            if magic != SHARED_MAGIC: generation = 0
+        return index, generation
+
+    def _block(self, region_id, nbytes):
+        block = self._blocks.get(region_id)
+        if block is not None and block.capacity >= nbytes:
+            return block
+        name = shared_block_name(region_id, self.prefix)
+        if block is None:
+            block = SharedRegionBlock(*self._open_index(name))
+            self._blocks[region_id] = block
+        size = SHARED_HEADER_SIZE + self.slots * (SHARED_SLOT.size + nbytes)
+        while True:
+            block.generation += 1
+            try:
+                data = shared_memory.SharedMemory(name=f"{name}_{block.generation}", create=True, size=size)
+                break
+            except FileExistsError:
+                continue
+        SHARED_BLOCK.pack_into(data.buf, 0, SHARED_MAGIC, self.slots, nbytes, block.seq)
+        SHARED_INDEX.pack_into(block.index.buf, 0, SHARED_MAGIC, block.generation, 0)
+        if block.data is not None:
+            block.data.close()
+            block.data.unlink()
+        block.data = data
+        block.capacity = nbytes
+        return block
+
+    def publish(self, region_id, slc, timestamp=None):
+        if timestamp is None: timestamp = time.time()
+        row = slc.width * 4
+        nbytes = row * slc.height
+        with self._lock:
+            if self.closed: return
+            block = self._block(region_id, nbytes)
+            seq = block.seq + 1
+            buf = block.data.buf
+            slot = SHARED_HEADER_SIZE + (seq % self.slots) * (SHARED_SLOT.size + block.capacity)
+            data = slot + SHARED_SLOT.size
+            SHARED_SLOT.pack_into(buf, slot, seq, slc.width, slc.height, timestamp, 0)
+            src = memoryview(slc.buf)
+            if slc.stride == row:
+                buf[data:data + nbytes] = src[slc.offset:slc.offset + nbytes]
+            else:
+                for y in range(slc.height):
+                    start = slc.offset + y * slc.stride
+                    buf[data + y * row:data + (y + 1) * row] = src[start:start + row]
+            struct.pack_into("<Q", buf, data - 8, seq)
+            struct.pack_into("<Q", buf, SHARED_BLOCK.size - 8, seq)
+            block.seq = seq
+            self.published += 1
+
+    def _release(self, block):
+        SHARED_INDEX.pack_into(block.index.buf, 0, SHARED_MAGIC, block.generation, 1)
+        for shm in (block.data, block.index):
+            if shm is None: continue
+            shm.close()
+            shm.unlink()
+
+    def forget(self, keep_ids):
+        with self._lock:
+            for rid in [rid for rid in self._blocks if rid not in keep_ids]:
+                self._release(self._blocks.pop(rid))
+
+    def close(self):
+        self.closed = True
+        self.forget(())
+
+
+class SharedFrameReader:
+    # Reference reader for SharedFrameSink blocks. read() copies the newest
+    # frame out; read(copy=False) returns a view into the slot instead, which
+    # stays valid while valid(seq) is true (at least slots - 1 more frames).
+    # Release such views before the next read, since a region that grew is
+    # re-attached there.
+    def __init__(self, region_id, prefix=SHARED_PREFIX):
+        self.name = shared_block_name(region_id, prefix)
+        self.index = None
+        self.data = None
+        self.generation = None
+        self.attach()
+
+    def attach(self):
+        self.close()
+        self.index = attach_shared_memory(self.name)
+        magic, _, _ = SHARED_INDEX.unpack_from(self.index.buf, 0)
+        if magic != SHARED_MAGIC:
+            raise ValueError(f"{self.name} is not a Buff Bar Zoom output block")
+        self._attach_data()
+
+    def _attach_data(self):
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+        _, self.generation, _ = SHARED_INDEX.unpack_from(self.index.buf, 0)
+        self.data = attach_shared_memory(f"{self.name}_{self.generation}")
+        _, self.slots, self.capacity, _ = SHARED_BLOCK.unpack_from(self.data.buf, 0)
+
+    def closed(self):
+        return self.index is None or SHARED_INDEX.unpack_from(self.index.buf, 0)[2] != 0
+
+    def latest_seq(self):
+        return struct.unpack_from("<Q", self.data.buf, SHARED_BLOCK.size - 8)[0]
+
+    def _slot(self, seq):
+        return SHARED_HEADER_SIZE + (seq % self.slots) * (SHARED_SLOT.size + self.capacity)
+
+    def valid(self, seq):
+        return struct.unpack_from("<Q", self.data.buf, self._slot(seq))[0] == seq
+
+    def read(self, last_seq=0, copy=True, retries=3):
+        # (seq, width, height, timestamp, pixels) for a frame newer than
+        # `last_seq`, or None
+        try:
+            if self.closed():
+                # the writer stopped; pick up a restarted one
+                self.attach()
+                if self.closed(): return None
+            elif SHARED_INDEX.unpack_from(self.index.buf, 0)[1] != self.generation:
+                self._attach_data()
+        except FileNotFoundError:
+            self.close()
+            return None
+        for _ in range(retries):
+            seq = self.latest_seq()
+            if seq == 0 or seq == last_seq: return None
+            slot = self._slot(seq)
+            begin, width, height, timestamp, end = SHARED_SLOT.unpack_from(self.data.buf, slot)
+            if begin != seq or end != seq: continue
+            data = slot + SHARED_SLOT.size
+            pixels = self.data.buf[data:data + width * height * 4]
+            if copy:
+                pixels = bytes(pixels)
+            if self.valid(seq):
+                return seq, width, height, timestamp, pixels
+        return None
+
+    def close(self):
+        for shm in (self.data, self.index):
+            if shm is not None:
+                shm.close()
+        self.data = None
+        self.index = None
+
+
+def zoomed_size(width, height, zoom):
+    return (int(width * zoom), int(height * zoom))
+
+
+def combined_size(sizes, gap=10):
+    return (sum(w for w, _ in sizes) + gap * (len(sizes) - 1), max(h for _, h in sizes))
+
+
+def rgbx_view(arr):
+    # PIL image sharing memory with a C-contiguous (h, w) uint32 RGBX array
+    return Image.frombuffer("RGBX", (arr.shape[1], arr.shape[0]), arr, "raw", "RGBX", 0, 1)
+
+
+class NumpyScaler:
+    # Nearest-neighbour zoom on uint32 pixels viewed straight from the grab
+    # buffer. Output is RGBX so the destination can be wrapped as a PIL image
+    # without copying; its RGB matches CaptureSlice.to_image().resize(NEAREST).
+    MAX_MAPS = 64
+
+    def __init__(self):
+        self._maps = {}
+
+    def index_map(self, n_in, n_out):
+        key = (n_in, n_out)
+        m = self._maps.get(key)
+        if m is None:
+            # Same accumulation as Pillow's nearest resize (ImagingScaleAffine):
+            # start half a step in and keep adding the step in double precision.
+            step = n_in / n_out
+            steps = np.full(n_out, step)
+            steps[0] = step * 0.5
+            m = np.cumsum(steps).astype(np.intp)
+            np.minimum(m, n_in - 1, out=m)
+            if len(self._maps) >= self.MAX_MAPS:
+                self._maps.clear()
+            self._maps[key] = m
+        return m
+
+    def source(self, slc):
+        return np.ndarray((slc.height, slc.width), '<u4', slc.buf, slc.offset, (slc.stride, 4))
+
+    def scale_into(self, slc, out):
+        self.scale_array(self.source(slc), out)
+
+    def scale_array(self, bgrx, out):
+        # swap B and R on the small source rather than on the zoomed output
+        src = (bgrx & 0xFF00FF00) | ((bgrx >> 16) & 0xFF) | ((bgrx & 0xFF) << 16)
+        h, w = src.shape
+        nh, nw = out.shape
+        if nh == h and nw == w:
+            out[...] = src
+            return
+        z = nw // w
+        if z * w == nw and z * h == nh:
+            # integer zoom: repeat columns once, then broadcast each widened
+            # row into its z output rows through a reshaped view
+            grouped = out.view()
+            grouped.shape = (h, z, nw)
+            grouped[...] = np.repeat(src, z, axis=1)[:, None, :]
+        else:
+            # gather columns on the small source first, then whole rows
+            cols = np.take(src, self.index_map(w, nw), axis=1)
+            out[...] = cols[self.index_map(h, nh)]
+
+
+class FilterChain:
+    # Per-region colour filters on the small pre-zoom grab. Contrast (around
+    # mid grey), gamma and threshold are folded into one 256-entry LUT when
+    # the chain is built; grayscale (Rec. 601 luma) runs before the LUT.
+    # Chains are cached by their parameters, so a LUT is only rebuilt when
+    # the parameters change.
+    IDENTITY = (1.0, 1.0, False, 0)
+
+    def __init__(self, contrast=1.0, gamma=1.0, grayscale=False, threshold=0):
+        self.key = (contrast, gamma, grayscale, threshold)
+        self.grayscale = grayscale
+        lut = []
+        for v in range(256):
+            v = (v - 128) * contrast + 128
+            v = min(255.0, max(0.0, v))
+            if gamma != 1.0:
+                v = 255.0 * (v / 255.0) ** (1.0 / max(0.01, gamma))
+            v = int(v + 0.5)
+            if threshold:
+                v = 255 if v >= threshold else 0
+            lut.append(v)
+        self.lut = lut
+        self.lut_rgb = lut * 3
+        self.lut_array = np.array(lut, np.uint8) if np is not None else None
+
+    def apply_image(self, img):
+        # RGB image in, RGB image out; both steps run in Pillow's C code
+        if self.grayscale:
+            return img.convert("L").point(self.lut).convert("RGB")
+        return img.point(self.lut_rgb)
+
+    def apply_slice(self, slc):
+        # BGRA slice in, tightly packed filtered copy out (the grab buffer
+        # may be shared with overlapping regions)
+        if self.grayscale:
+            src = np.ndarray((slc.height, slc.width, 4), np.uint8, slc.buf, slc.offset, (slc.stride, 4, 1))
+            # Pillow's fixed-point "L" conversion, so both engines agree.
+            # Widen first: NumPy 1.x keeps uint8 * uint32 scalar in uint16.
+            luma = src[..., 2].astype(np.uint32) * 19595
+            luma += src[..., 1].astype(np.uint32) * 38470
+            luma += src[..., 0].astype(np.uint32) * 7471
+            luma += 0x8000
+            luma >>= 16
+            out = self.lut_array.take(luma).astype('<u4') * np.uint32(0x010101) | np.uint32(0xFF000000)
+        else:
+            src = np.ndarray((slc.height, slc.width * 4), np.uint8, slc.buf, slc.offset, (slc.stride, 1))
+            out = self.lut_array.take(src).view('<u4')
+            out |= np.uint32(0xFF000000)
+        return CaptureSlice(out.reshape(-1).data.cast('B'), 0, slc.width * 4, slc.width, slc.height)
+
+
+def release_retired(retired):
+    # unlinked blocks can only be closed once no array views into them remain
+    for shm in list(retired):
+        try:
+            shm.close()
+            retired.remove(shm)
+        except BufferError:
+            pass
+
+
+def retire_shared(shm, retired):
+    shm.unlink()
+    retired.append(shm)
+    release_retired(retired)
+
+
+_pool_blocks = {}
+_pool_scaler = NumpyScaler() if np is not None else None
+
+
+def _pool_attach(*names):
+    missing = [name for name in names if name not in _pool_blocks]
+    if missing and len(_pool_blocks) + len(missing) > 16:
+        # blocks are never reused under the same name; drop the old ones, but
+        # not the task's own: an array into a closed block segfaults
+        for name in [name for name in _pool_blocks if name not in names]:
+            _pool_blocks.pop(name).close()
+    for name in missing:
+        _pool_blocks[name] = attach_shared_memory(name)
+    return [_pool_blocks[name] for name in names]
+
+
+def _pool_scale(task):
+    # runs in a ScalePool worker: (input block, offset, w, h, output block,
+    # output shape, x, y, zoomed w, zoomed h)
+    in_name, in_offset, w, h, out_name, out_shape, x, y, nw, nh = task
+    in_block, out_block = _pool_attach(in_name, out_name)
+    src = np.ndarray((h, w), '<u4', in_block.buf, in_offset)
+    out = np.ndarray(out_shape, '<u4', out_block.buf)
+    _pool_scaler.scale_array(src, out[y:y + nh, x:x + nw])
+
+
+class ScalePool:
+    # Optional multi-core scaling for the NumPy engine. Sources are copied
+    # into a shared input block and workers write straight into the
+    # shared-memory frame buffers, so only small task tuples are pickled.
+    # Ticks with fewer than `min_pixels` output pixels stay in-process, where
+    # dispatch would cost more than it saves (see bench_pool.py).
+    def __init__(self, workers=None, min_pixels=1500000):
+        self.workers = max(1, workers or (os.cpu_count() or 2) - 1)
+        self.min_pixels = min_pixels
+        self.dispatched = 0
+        self.inline = 0
+        self._pool = multiprocessing.get_context("spawn").Pool(self.workers)
+        self._input = None
+        self._retired = []
+
+    def use_for(self, pixels):
+        if pixels >= self.min_pixels:
+            self.dispatched += 1
+            return True
+        self.inline += 1
+        return False
+
+    def _input_block(self, nbytes):
+        if self._input is None or self._input.size < nbytes:
+            if self._input is not None:
+                retire_shared(self._input, self._retired)
+            size = max(nbytes, 2 * self._input.size if self._input is not None else 0)
+            self._input = shared_memory.SharedMemory(create=True, size=size)
+        return self._input
+
+    def scale(self, jobs):
+        # jobs: (slice, output block name, output shape, x, y, zoomed w, zoomed h)
+        if not jobs: return
+        block = self._input_block(sum(slc.width * slc.height * 4 for slc, *_ in jobs))
+        tasks = []
+        offset = 0
+        for slc, out_name, out_shape, x, y, nw, nh in jobs:
+            dst = np.ndarray((slc.height, slc.width), '<u4', block.buf, offset)
+            dst[...] = _pool_scaler.source(slc)
+            tasks.append((block.name, offset, slc.width, slc.height, out_name, out_shape, x, y, nw, nh))
+            offset += slc.width * slc.height * 4
+        del dst
+        self._pool.map(_pool_scale, tasks, chunksize=max(1, len(tasks) // self.workers))
+
+    def close(self):
+        self._pool.terminate()
+        self._pool.join()
+        if self._input is not None:
+            retire_shared(self._input, self._retired)
+            self._input = None
+
+
+class FrameScheduler:
+    # Paces a loop against absolute deadlines on a fixed grid, subtracting the
+    # time the work took. Falling a whole period behind skips the missed
+    # deadlines instead of running them back to back.
+    def __init__(self, fps, window=120):
+        self.fps = max(1, fps)
+        self.ticks = 0
+        self.late = 0
+        self.dropped = 0
+        self._next = None
+        self._last_tick = None
+        self._intervals = deque(maxlen=window)
+
+    def set_fps(self, fps):
+        fps = max(1, fps)
+        if fps != self.fps:
+            self.fps = fps
+            self._next = None
+            self._intervals.clear()
+
+    def reset(self):
+        self._next = None
+        self._last_tick = None
+        self._intervals.clear()
+
+    def tick(self, now=None):
+        # call when a frame starts
+        if now is None: now = time.perf_counter()
+        if self._last_tick is not None:
+            self._intervals.append(now - self._last_tick)
+        if self._next is None:
+            self._next = now
+        self._last_tick = now
+        self.ticks += 1
+
+    def next_delay(self, now=None):
+        # call when a frame's work is done; seconds to wait for the next deadline
+        if now is None: now = time.perf_counter()
+        period = 1.0 / self.fps
+        if self._next is None:
+            self._next = now
+        self._next += period
+        behind = now - self._next
+        if behind >= period:
+            missed = int(behind / period)
+            self.dropped += missed
+            self._next += missed * period
+        if now > self._next:
+            self.late += 1
+        return max(0.0, self._next - now)
+
+    def achieved_fps(self):
+        total = sum(self._intervals)
+        return len(self._intervals) / total if total > 0 else 0.0
+
+    def jitter_ms(self):
+        if len(self._intervals) < 2: return 0.0
+        return statistics.pstdev(self._intervals) * 1000
+
+    def summary(self):
+        return f"{self.achieved_fps():.1f} fps, jitter {self.jitter_ms():.1f} ms, late {self.late}, missed {self.dropped}"
+
+
+class RegionScheduler:
+    # Min-heap of (due time, -priority, region id). Each tick pops only the
+    # regions whose own refresh interval has elapsed.
+    def __init__(self):
+        self._heap = []
+        self._key = None
+        self._period = {}
+
+    def sync(self, regions, default_fps, now):
+        key = tuple((r.id, r.fps or default_fps, r.priority) for r in regions)
+        if key == self._key: return
+        old_due = {rid: due for due, _, rid in self._heap}
+        self._key = key
+        self._period = {rid: 1.0 / max(1, fps) for rid, fps, _ in key}
+        self._heap = [(old_due.get(rid, now), -prio, rid) for rid, _, prio in key]
+        heapq.heapify(self._heap)
+
+    def max_fps(self):
+        return max((1.0 / p for p in self._period.values()), default=1)
+
+    def force_all(self, now):
+        self._heap = [(now, prio, rid) for _, prio, rid in self._heap]
+        heapq.heapify(self._heap)
+
+    def pop_due(self, now, limit=None):
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap))
+        if limit is not None and len(due) > limit:
+            # behind schedule: higher priority goes first, the rest stay due
+            due.sort(key=lambda e: (e[1], e[0]))
+            for entry in due[limit:]:
+                heapq.heappush(self._heap, entry)
+            due = due[:limit]
+        for when, prio, rid in due:
+            period = self._period[rid]
+            when += period
+            if when <= now:
+                when = now + period
+            heapq.heappush(self._heap, (when, prio, rid))
+        return {rid for _, _, rid in due}
+
+
+def foreground_window_title():
+    # None where it cannot be determined (not on Windows, no foreground window)
+    try:
+        user32 = ctypes.windll.user32
+    except AttributeError:
+        return None
+    hwnd = user32.GetForegroundWindow()
+    if not hwnd: return None
+    length = user32.GetWindowTextLengthW(hwnd)
+    buf = ctypes.create_unicode_buffer(length + 1)
+    user32.GetWindowTextW(hwnd, buf, length + 1)
+    return buf.value
+
+
+class IdleGovernor:
+    # Adaptive capture rate. After `idle_after` seconds without a detected
+    # change the rate halves, and halves again every further `idle_after`
+    # seconds down to `floor_fps`. A change, wake() or regaining focus puts it
+    # back at full rate. With `game_window` set, capture pauses while the
+    # foreground window title does not contain it.
+    FOCUS_POLL = 0.25
+    PAUSED_FPS = 4
+
+    def __init__(self, idle_after=10.0, floor_fps=2, game_window="", clock=time.perf_counter, foreground=foreground_window_title):
+        self.enabled = True
+        self.idle_after = idle_after
+        self.floor_fps = floor_fps
+        self.game_window = game_window
+        self.clock = clock
+        self.foreground = foreground
+        self.reset()
+
+    def reset(self):
+        self.last_change = self.clock()
+        self.level = 0
+        self.paused = False
+        self.full_fps = 1
+        self.fps = 1
+        self.expected_ticks = 0.0
+        self.ticks = 0
+        self.work_ticks = 0
+        self.work_cpu = 0.0
+        self.wake_latencies = deque(maxlen=120)
+        self.last_wake = None
+        self._wake_at = None
+        self._last_tick = None
+        self._focus_checked = None
+
+    def wake(self, now=None):
+        # safe to call from other threads (hotkeys)
+        self._wake_at = self.clock() if now is None else now
+
+    def active(self, now):
+        # False while paused for focus; polls the foreground window at most
+        # every FOCUS_POLL seconds
+        if not self.game_window:
+            self.paused = False
+            return True
+        if self._focus_checked is None or now - self._focus_checked >= self.FOCUS_POLL:
+            self._focus_checked = now
+            title = self.foreground()
+            paused = title is not None and self.game_window.lower() not in title.lower()
+            if self.paused and not paused and self._wake_at is None:
+                self._wake_at = self._last_tick if self._last_tick is not None else now
+            self.paused = paused
+        return not self.paused
+
+    def work_done(self, cpu_seconds):
+        self.work_ticks += 1
+        self.work_cpu += cpu_seconds
+
+    def rate(self, now, changed, full_fps):
+        # call once per tick with the tick start; returns the fps for the next tick
+        self.full_fps = full_fps
+        throttled = self.paused or self.fps < full_fps
+        if self._last_tick is not None:
+            self.expected_ticks += (now - self._last_tick) * full_fps
+        prev_tick = self._last_tick
+        self._last_tick = now
+        self.ticks += 1
+
+        self.last_wake = None
+        wake_at = self._wake_at
+        if wake_at is not None or changed:
+            self._wake_at = None
+            if throttled and not self.paused:
+                # for a change, the worst case is that it appeared right after the previous tick
+                start = wake_at if wake_at is not None else prev_tick
+                if start is not None:
+                    self.last_wake = max(0.0, now - start)
+                    self.wake_latencies.append(self.last_wake)
+            self.last_change = now
+            self.level = 0
+        elif self.enabled and self.idle_after > 0:
+            self.level = int((now - self.last_change) / self.idle_after)
+        else:
+            self.level = 0
+
+        if self.paused:
+            self.fps = min(full_fps, self.PAUSED_FPS)
+        else:
+            self.fps = min(full_fps, max(self.floor_fps, full_fps * 0.5 ** min(self.level, 16)))
+        return self.fps
+
+    def cpu_saved(self):
+        # seconds of capture-thread CPU not spent compared to full rate
+        if not self.work_ticks: return 0.0
+        saved_ticks = max(0.0, self.expected_ticks - self.ticks)
+        return saved_ticks * self.work_cpu / self.work_ticks
+
+    def saved_fraction(self):
+        if self.expected_ticks <= 0: return 0.0
+        return max(0.0, 1.0 - self.ticks / self.expected_ticks)
+
+    def wake_ms(self):
+        if not self.wake_latencies: return (0.0, 0.0)
+        ms = sorted(v * 1000 for v in self.wake_latencies)
+        return (ms[len(ms) // 2], ms[-1])
+
+    def summary(self):
+        if self.paused:
+            state = "paused (unfocused)"
+        elif self.fps < self.full_fps:
+            state = f"idle {self.fps:.0f} fps"
+        else:
+            state = "full rate"
+        p50, worst = self.wake_ms()
+        return (f"{state}, ~{self.cpu_saved():.1f}s CPU saved ({self.saved_fraction() * 100:.0f}% ticks), "
+                f"wake p50 {p50:.0f} / max {worst:.0f} ms")
+
+
+class Instrumentation:
+    # Per stage (and optionally per region) timings kept in fixed-size rings.
+    # Call sites use `t0 = instr.clock()` / `instr.record(stage, t0)`; while
+    # disabled both are a single attribute check. A start taken while
+    # disabled is 0.0 and its sample is dropped.
+    def __init__(self, window=600):
+        self.enabled = False
+        self.window = window
+        self.errors = 0
+        self.last_error = None
+        self._rings = {}
+        self._lock = threading.Lock()
+
+    def clock(self):
+        return time.perf_counter() if self.enabled else 0.0
+
+    def record(self, stage, start, region=None):
+        if not self.enabled or not start: return
+        now = time.perf_counter()
+        key = (stage, region)
+        ring = self._rings.get(key)
+        if ring is None:
+            with self._lock:
+                ring = self._rings.setdefault(key, deque(maxlen=self.window))
+        ring.append((time.time(), now - start))
+
+    def error(self, where, exc):
+        self.errors += 1
+        self.last_error = f"{where}: {exc}"
+        print(f"Error in {where}: {exc}")
+
+    def reset(self):
+        with self._lock:
+            self._rings = {}
+        self.errors = 0
+        self.last_error = None
+
+    def snapshot(self):
+        with self._lock:
+            items = list(self._rings.items())
+        return [(key, list(ring)) for key, ring in items]
+
+    def percentiles(self):
+        rows = []
+        for (stage, region), samples in self.snapshot():
+            if not samples: continue
+            ms = sorted(elapsed * 1000 for _, elapsed in samples)
+            pick = lambda q: ms[min(len(ms) - 1, int(q * len(ms)))]
+            rows.append((stage, region, len(ms), pick(0.50), pick(0.95), pick(0.99)))
+        rows.sort(key=lambda row: (row[0], row[1] is not None, row[1] or 0))
+        return rows
+
+    def export_jsonl(self, path):
+        count = 0
+        with open(path, 'w') as f:
+            for (stage, region), samples in self.snapshot():
+                for ts, elapsed in samples:
+                    f.write(json.dumps({'ts': ts, 'stage': stage, 'region': region, 'ms': elapsed * 1000}) + "\n")
+                    count += 1
+        return count
+
+
+RegionSpec = namedtuple('RegionSpec', ['id', 'left', 'top', 'width', 'height', 'zoom', 'fps', 'priority', 'filters'],
+                        defaults=[None])
+PipelineSpec = namedtuple('PipelineSpec', ['regions', 'separate', 'coalesce', 'fps', 'skip_unchanged', 'change_threshold', 'engine'])
+
+
+class Region:
+    # Source of truth for one region. Tk variables in the setup panel are
+    # bound to it through traces; the capture side only ever sees RegionSpecs.
+    __slots__ = ('id', 'x', 'y', 'w', 'h', 'on', 'zoom', 'fps', 'priority', 'contrast', 'gamma', 'grayscale', 'threshold',
+                 'triggers')
+    TYPES = {'x': int, 'y': int, 'w': int, 'h': int, 'on': bool, 'zoom': float, 'fps': int, 'priority': int,
+             'contrast': float, 'gamma': float, 'grayscale': bool, 'threshold': int}
+    DEFAULTS = {'x': 100, 'y': 100, 'w': 100, 'h': 50, 'on': True, 'zoom': 2.0, 'fps': 0, 'priority': 0,
+                'contrast': 1.0, 'gamma': 1.0, 'grayscale': False, 'threshold': 0}
+
+    def __init__(self, region_id, data=None):
+        self.id = region_id
+        data = data or {}
+        for key, default in self.DEFAULTS.items():
+            setattr(self, key, self.TYPES[key](data.get(key, default)))
+        # alert rules stay plain dicts here; TriggerEngine compiles them
+        self.triggers = [dict(t) for t in data.get('triggers', []) if isinstance(t, dict)]
+
+    def set(self, key, value):
+        value = self.TYPES[key](value)
+        if getattr(self, key) == value: return False
+        setattr(self, key, value)
+        return True
+
+    def to_dict(self):
+        data = {'id': self.id}
+        data.update((key, getattr(self, key)) for key in self.DEFAULTS)
+        if self.triggers:
+            data['triggers'] = self.triggers
+        return data
+
+    def filters(self):
+        key = (self.contrast, self.gamma, self.grayscale, self.threshold)
+        return None if key == FilterChain.IDENTITY else key
+
+    def spec(self, offset_x, offset_y):
+        return RegionSpec(self.id, offset_x + self.x, offset_y + self.y, self.w, self.h,
+                          self.zoom, max(0, self.fps), self.priority, self.filters())
+
+
+def build_region_specs(regions, offset_x, offset_y):
+    return tuple(r.spec(offset_x, offset_y) for r in regions if r.on)
+
+
+class MirrorFrame:
+    # Announces which FrameBuffers (one per mirror window) were repainted.
+    __slots__ = ('seq', 'timestamp', 'separate', 'dirty')
+
+    def __init__(self, seq, timestamp, separate, dirty):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.separate = separate
+        self.dirty = dirty
+
+    def merge_older(self, older):
+        # a dropped frame's repaints still have to reach the screen
+        if older.separate == self.separate:
+            self.dirty |= older.dirty
+
+
+class FrameBuffer:
+    # `image` is written by the capture worker and read by Tk, both under
+    # `lock`. The photo/label/shown_size fields belong to the Tk thread.
+    __slots__ = ('lock', 'image', 'array', 'shm', 'engine', 'photo', 'label', 'shown_size')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.image = None
+        self.array = None
+        self.shm = None
+        self.engine = None
+        self.photo = None
+        self.label = None
+        self.shown_size = None
+
+
+class FrameBufferManager:
+    # One persistent composite per mirror window, reallocated only when its
+    # size or the engine changes. "shared" buffers are NumPy arrays in shared
+    # memory so ScalePool workers can write into them.
+    def __init__(self):
+        self.buffers = []
+        self.allocations = 0
+        self._retired = []
+
+    def resize(self, count):
+        if len(self.buffers) != count:
+            for buf in self.buffers[count:]:
+                self.release(buf)
+            self.buffers = self.buffers[:count] + [FrameBuffer() for _ in range(count - len(self.buffers))]
+
+    def release(self, buf):
+        if buf.shm is not None:
+            shm, buf.shm = buf.shm, None
+            retire_shared(shm, self._retired)
+
+    def ensure(self, index, size, engine):
+        buf = self.buffers[index]
+        if buf.image is not None and buf.image.size == size and buf.engine == engine:
+            return buf
+        with buf.lock:
+            old = buf.shm
+            buf.shm = None
+            if engine == "shared":
+                buf.shm = shared_memory.SharedMemory(create=True, size=max(4, size[0] * size[1] * 4))
+                buf.array = np.ndarray((size[1], size[0]), '<u4', buf.shm.buf)
+                buf.array.fill(0)
+                buf.image = rgbx_view(buf.array)
+            elif engine == "numpy":
+                buf.array = np.zeros((size[1], size[0]), '<u4')
+                buf.image = rgbx_view(buf.array)
+            else:
+                buf.array = None
+                buf.image = Image.new('RGB', size, (0,0,0))
+            buf.engine = engine
+        if old is not None:
+            retire_shared(old, self._retired)
+        self.allocations += 1
+        return buf
+
+    def adopt(self, index, image):
+        # takes over an image that was freshly allocated elsewhere
+        buf = self.buffers[index]
+        with buf.lock:
+            old = buf.shm
+            buf.shm = None
+            buf.image = image
+            buf.array = None
+            buf.engine = "pil"
+        if old is not None:
+            retire_shared(old, self._retired)
+
+
+class LatestFrameQueue:
+    # Single-slot queue: a new frame replaces one that was never presented.
     def __init__(self):
+        self._lock = threading.Lock()
+        self._frame = None
+        self.produced = 0
+        self.dropped = 0
+
+    def put(self, frame):
+        with self._lock:
+            if self._frame is not None:
+                frame.merge_older(self._frame)
+                self.dropped += 1
+            self._frame = frame
+            self.produced += 1
+
+    def get(self):
+        with self._lock:
+            frame, self._frame = self._frame, None
+            return frame
+
+    def clear(self):
+        with self._lock:
+            self._frame = None
+
+
+class CapturePipeline:
+    # Runs grab -> convert -> resize -> composite on a worker thread. The Tk
+    # thread publishes a PipelineSpec and presents whatever comes out.
+    def __init__(self, monitors, source_factory=None):
+        self.monitors = monitors
+        self.source_factory = source_factory or MssSource
+        self.spec = None
+        self.output = LatestFrameQueue()
+        self.detector = ChangeDetector()
+        self.instr = Instrumentation()
+        self.scheduler = FrameScheduler(30)
+        self.region_scheduler = RegionScheduler()
+        self.idle = IdleGovernor()
+        self.history = FrameHistory()
+        self.triggers = TriggerEngine()
+        self.sink = None
+        self.regions_captured = 0
+        self.saw_change = False
+        self._last_late = 0
+        self.seq = 0
+        self._layout = None
+        self.buffers = FrameBufferManager()
+        self.scaler = NumpyScaler() if np is not None else None
+        self.filter_chains = {}
+        self.pool = None
+        self.pool_workers = 0  # 0 = scale in-process only
+        self.pool_min_pixels = 1500000
+        self._refresh = True
+        self._thread = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    def start(self):
+        if self.is_running(): return
+        # a fresh event per run, so a worker that outlived stop()'s join
+        # timeout still exits instead of being revived
+        self._stop = threading.Event()
+        self.request_refresh()
+        self.detector.reset()
+        self.scheduler.reset()
+        self.idle.reset()
+        self._thread = threading.Thread(target=self._run, args=(self._stop,), name="BuffBarZoom-capture", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.output.clear()
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def request_refresh(self):
+        # next frame repaints every region, e.g. after mirror windows were rebuilt
+        self._refresh = True
+
+    def wake(self):
+        # back to full rate and cut the current idle sleep short
+        self.idle.wake()
+        self._wake.set()
+
+    def _run(self, stop):
+        # mss handles are bound to the thread that created them
+        with self.source_factory() as source:
+            capture = BatchedCapture(source, self.monitors)
+            while not stop.is_set():
+                spec = self.spec
+                self.scheduler.tick()
+                now = time.perf_counter()
+                changed = False
+                if spec is not None and spec.regions and self.idle.active(now):
+                    t0 = self.instr.clock()
+                    cpu0 = time.thread_time()
+                    try:
+                        frame = self.process(capture, spec)
+                        if frame is not None:
+                            self.output.put(frame)
+                        changed = self.saw_change
+                    except Exception as e:
+                        self.instr.error("capture", e)
+                    self.idle.work_done(time.thread_time() - cpu0)
+                    self.instr.record("tick", t0)
+                if spec is not None:
+                    # tick as fast as the fastest region needs, unless idle
+                    self.scheduler.set_fps(self.idle.rate(now, changed, self.region_scheduler.max_fps()))
+                    if self.idle.last_wake is not None:
+                        self.instr.record("wake", time.perf_counter() - self.idle.last_wake)
+                if self._wake.wait(self.scheduler.next_delay()):
+                    self._wake.clear()
+
+    def sync_pool(self):
+        # runs on the capture thread, so a pool is never closed mid-map
+        want = self.pool_workers if self.scaler is not None else 0
+        pool = self.pool
+        if pool is not None and (not want or pool.workers != want):
+            self.pool = None
+            pool.close()
+        if want and self.pool is None:
+            try:
+                self.pool = ScalePool(want, self.pool_min_pixels)
+            except Exception as e:
+                self.pool_workers = 0
+                self.instr.error("pool", e)
+        if self.pool is not pool:
+            # the buffer engine follows the pool and a new composite starts
+            # black, so static regions must be painted again
+            self.request_refresh()
+        if self.pool is not None:
+            self.pool.min_pixels = self.pool_min_pixels
+
+    def close_pool(self):
+        # call with the capture thread stopped
+        self.pool_workers = 0
+        self.sync_pool()
+
+    def close(self):
+        # releases worker processes and shared memory; call after stop()
+        self.close_pool()
+        self.buffers.resize(0)
+        if self.sink is not None:
+            self.sink.close()
+
+    def process(self, capture, spec):
+        self.saw_change = False
+        self.sync_pool()
+        regions = [r for r in spec.regions if r.width > 0 and r.height > 0]
+        if not regions:
+            return None
+        now = time.perf_counter()
+        # filters are part of the layout: a static region would otherwise
+        # never be repainted with its new filters
+        layout = (spec.separate, spec.engine, tuple((r.id, r.width, r.height, r.zoom, r.filters) for r in regions))
+        full = self._refresh or layout != self._layout
+        self._refresh = False
+        self._layout = layout
+        self.detector.threshold = spec.change_threshold
+
+        self.region_scheduler.sync(regions, spec.fps, now)
+        if full:
+            self.region_scheduler.force_all(now)
+        # accept deadlines up to half a tick early so a region at the tick
+        # rate is not pushed to the following tick by timer noise
+        slack = 0.5 / self.scheduler.fps
+        limit = None
+        if self.scheduler.late and self._last_late != self.scheduler.late:
+            limit = max(1, (len(regions) + 1) // 2)
+        self._last_late = self.scheduler.late
+        due = self.region_scheduler.pop_due(now + slack, None if full else limit)
+        if not due:
+            return None
+
+        due_regions = [r for r in regions if r.id in due]
+        rects = [(r.left, r.top, r.width, r.height) for r in regions]
+        wanted = {i for i, r in enumerate(regions) if r.id in due}
+        instr = self.instr
+        t0 = instr.clock()
+        captured = {}
+        for r, slc in zip(regions, capture.grab(rects, spec.coalesce, wanted)):
+            if slc is not None:
+                captured[r.id] = slc
+        instr.record("grab", t0)
+        self.regions_captured += len(due_regions)
+
+        changed = set()
+        for r in due_regions:
+            t0 = instr.clock()
+            dirty = self.detector.changed(r.id, captured[r.id])
+            instr.record("detect", t0, r.id)
+            if full or dirty or not spec.skip_unchanged:
+                changed.add(r.id)
+            if self.triggers.wants(r.id, dirty):
+                t0 = instr.clock()
+                self.triggers.update(r.id, captured[r.id])
+                instr.record("trigger", t0, r.id)
+            if dirty:
+                self.saw_change = True
+                if self.history.enabled:
+                    t0 = instr.clock()
+                    self.history.add(r.id, captured[r.id], (r.left, r.top, r.width, r.height), now)
+                    instr.record("history", t0, r.id)
+            # full covers a sink enabled mid-run: static regions still need a first frame
+            sink = self.sink
+            if sink is not None and (full or dirty):
+                t0 = instr.clock()
+                sink.publish(r.id, captured[r.id])
+                instr.record("shared", t0, r.id)
+        if not changed:
+            return None
+
+        # regions that were not due keep their last frame in the buffers
+        present = [(r, captured.get(r.id)) for r in regions]
+        sizes = [zoomed_size(r.width, r.height, r.zoom) for r, _ in present]
+        engine = "numpy" if spec.engine == "numpy" and self.scaler is not None else "pil"
+        self.buffers.resize(len(present) if spec.separate else 1)
+        if engine == "numpy":
+            dirty = self.render_numpy(spec, present, sizes, changed)
+        else:
+            dirty = self.render_pil(spec, present, sizes, changed)
+
+        self.seq += 1
+        # stamped with the tick start so latency covers grab to present
+        return MirrorFrame(self.seq, now, spec.separate, dirty)
+
+    def filter_chain(self, key):
+        chain = self.filter_chains.get(key)
+        if chain is None:
+            if len(self.filter_chains) >= 64:
+                self.filter_chains.clear()
+            chain = FilterChain(*key)
+            self.filter_chains[key] = chain
+        return chain
+
+    def render_pil(self, spec, present, sizes, changed):
+        instr = self.instr
+        tiles = {}
+        for (r, slc), size in zip(present, sizes):
+            if r.id in changed:
+                t0 = instr.clock()
+                img = slc.to_image()
+                instr.record("convert", t0, r.id)
+                if r.filters:
+                    t0 = instr.clock()
+                    img = self.filter_chain(r.filters).apply_image(img)
+                    instr.record("filter", t0, r.id)
+                t0 = instr.clock()
+                tiles[r.id] = img.resize(size, Image.NEAREST)
+                instr.record("resize", t0, r.id)
+
+        dirty = set()
+        if spec.separate:
+            for i, (r, _) in enumerate(present):
+                if r.id not in changed: continue
+                # resize already allocated a fresh image, adopt it
+                self.buffers.adopt(i, tiles[r.id])
+                dirty.add(i)
+            return dirty
+
+        buf = self.buffers.ensure(0, combined_size(sizes), "pil")
+        t0 = instr.clock()
+        with buf.lock:
+            current_x = 0
+            for (r, _), size in zip(present, sizes):
+                if r.id in changed:
+                    buf.image.paste(tiles[r.id], (current_x, 0))
+                current_x += size[0] + 10
+        instr.record("composite", t0)
+        dirty.add(0)
+        return dirty
+
+    def render_numpy(self, spec, present, sizes, changed):
+        # convert, resize and composite are one step here, timed as "scale"
+        pool = self.pool
+        engine = "shared" if pool is not None else "numpy"
+        jobs = []  # (region, slice, buffer index, x, zoomed w, zoomed h)
+        if spec.separate:
+            for i, ((r, slc), size) in enumerate(zip(present, sizes)):
+                if r.id not in changed: continue
+                self.buffers.ensure(i, size, engine)
+                jobs.append((r, slc, i, 0, size[0], size[1]))
+        else:
+            self.buffers.ensure(0, combined_size(sizes), engine)
+            current_x = 0
+            for (r, slc), (nw, nh) in zip(present, sizes):
+                if r.id in changed:
+                    jobs.append((r, slc, 0, current_x, nw, nh))
+                current_x += nw + 10
+
+        instr = self.instr
+        for n, (r, slc, i, x, nw, nh) in enumerate(jobs):
+            if r.filters:
+                t0 = instr.clock()
+                jobs[n] = (r, self.filter_chain(r.filters).apply_slice(slc), i, x, nw, nh)
+                instr.record("filter", t0, r.id)
+        dirty = {i for _, _, i, _, _, _ in jobs}
+        buffers = [self.buffers.buffers[i] for i in sorted(dirty)]
+        for buf in buffers:
+            buf.lock.acquire()
+        try:
+            if pool is not None and pool.use_for(sum(nw * nh for *_, nw, nh in jobs)):
+                t0 = instr.clock()
+                pool.scale([(slc, self.buffers.buffers[i].shm.name, self.buffers.buffers[i].array.shape, x, 0, nw, nh)
+                            for _, slc, i, x, nw, nh in jobs])
+                instr.record("pool", t0)
+            else:
+                for r, slc, i, x, nw, nh in jobs:
+                    t0 = instr.clock()
+                    self.scaler.scale_into(slc, self.buffers.buffers[i].array[:nh, x:x + nw])
+                    instr.record("scale", t0, r.id)
+        finally:
+            for buf in buffers:
+                buf.lock.release()
+        return dirty
+
+
+class RegionRow:
+    # One recyclable editor row. bind() points it at another Region; the
+    # variable traces only forward edits while a region is bound.
+    def __init__(self, parent, on_change, on_remove, on_collapse, limits, on_alerts=None):
+        self.region = None
+        self.index = -1
+        self.on_change = on_change
+        self.vars = {}
+        for key, kind in Region.TYPES.items():
+            var_class = {bool: tk.BooleanVar, float: tk.DoubleVar}.get(kind, tk.IntVar)
+            var = var_class(master=parent)
+            var.trace_add('write', lambda *args, key=key, var=var: self.forward(key, var))
+            self.vars[key] = var
+
+        self.frame = ttk.LabelFrame(parent, text="", padding=2)
+        header = tk.Frame(self.frame)
+        header.pack(fill="x", pady=0)
+        ttk.Checkbutton(header, text="Enable", variable=self.vars['on']).pack(side="left")
+        ttk.Button(header, text="X", width=3, command=lambda: self.region and on_remove(self.region)).pack(side="right", padx=2)
+        self.btn_min = ttk.Button(header, text="[-]", width=3, command=lambda: self.region and on_collapse(self.region))
+        self.btn_min.pack(side="right", padx=2)
+        if on_alerts is not None:
+            ttk.Button(header, text="Alerts", width=6, command=lambda: self.region and on_alerts(self.region)).pack(side="right", padx=2)
+
+        self.content = tk.Frame(self.frame)
+        self.content.pack(fill="x", pady=2)
+        self.collapsed = False
+        self.scale_x = self.make_slider("X", self.vars['x'], limits[0])
+        self.scale_y = self.make_slider("Y", self.vars['y'], limits[1])
+        self.make_slider("W", self.vars['w'], 800)
+        self.make_slider("H", self.vars['h'], 300)
+        self.make_zoom_slider("Zoom", self.vars['zoom'])
+        self.make_rate_row()
+        self.make_filter_row()
+
+    def make_slider(self, label, var, max_val):
+        frame = ttk.Frame(self.content)
+        frame.pack(fill="x", padx=2, pady=1)
+        ttk.Label(frame, text=label, width=2).pack(side="left")
+        scale = ttk.Scale(frame, from_=0, to=max_val, variable=var, orient='horizontal')
+        scale.pack(side="left", fill="x", expand=True)
+        ttk.Entry(frame, textvariable=var, width=5).pack(side="right")
+        return scale
+
+    def make_zoom_slider(self, label, var):
+        frame = ttk.Frame(self.content)
+        frame.pack(fill="x", padx=2, pady=1)
+        ttk.Label(frame, text=label, width=5).pack(side="left")
+        scale = ttk.Scale(frame, from_=1.0, to=5.0, variable=var, orient='horizontal')
+        scale.pack(side="left", fill="x", expand=True)
+        ttk.Entry(frame, textvariable=var, width=5).pack(side="right")
+        return scale
+
+    def make_rate_row(self):
+        frame = ttk.Frame(self.content)
+        frame.pack(fill="x", padx=2, pady=1)
+        ttk.Label(frame, text="FPS (0 = global)").pack(side="left")
+        ttk.Spinbox(frame, from_=0, to=144, textvariable=self.vars['fps'], width=5).pack(side="left", padx=2)
+        ttk.Spinbox(frame, from_=-9, to=9, textvariable=self.vars['priority'], width=3).pack(side="right")
+        ttk.Label(frame, text="Priority").pack(side="right", padx=2)
+
+    def make_filter_row(self):
+        frame = ttk.Frame(self.content)
+        frame.pack(fill="x", padx=2, pady=1)
+        ttk.Checkbutton(frame, text="Gray", variable=self.vars['grayscale']).pack(side="left")
+        ttk.Label(frame, text="Contrast").pack(side="left", padx=(5, 0))
+        ttk.Spinbox(frame, from_=0.0, to=4.0, increment=0.1, textvariable=self.vars['contrast'], width=4).pack(side="left", padx=2)
+        ttk.Label(frame, text="Gamma").pack(side="left", padx=(5, 0))
+        ttk.Spinbox(frame, from_=0.1, to=4.0, increment=0.1, textvariable=self.vars['gamma'], width=4).pack(side="left", padx=2)
+        ttk.Spinbox(frame, from_=0, to=255, increment=5, textvariable=self.vars['threshold'], width=4).pack(side="right")
+        ttk.Label(frame, text="Threshold").pack(side="right", padx=2)
+
+    def forward(self, key, var):
+        if self.region is not None:
+            self.on_change(self.region, key, var)
+
+    def bind(self, region, index, collapsed):
+        self.region = None
+        for key, var in self.vars.items():
+            var.set(getattr(region, key))
+        self.frame.configure(text=f"Region {index+1}")
+        self.set_collapsed(collapsed)
+        self.region = region
+        self.index = index
+
+    def unbind(self):
+        self.region = None
+        self.index = -1
+        self.frame.place_forget()
+
+    def set_collapsed(self, collapsed):
+        if collapsed == self.collapsed: return
+        if collapsed:
+            self.content.pack_forget()
+            self.btn_min.config(text="[+]")
+        else:
+            self.content.pack(fill="x", pady=2)
+            self.btn_min.config(text="[-]")
+        self.collapsed = collapsed
+
+    def set_limits(self, width, height):
+        self.scale_x.configure(to=width)
+        self.scale_y.configure(to=height)
+
+
+class RegionListView:
+    # Virtualized region editor. Only the rows inside the viewport exist as
+    # widgets; scrolling re-binds them to other regions. Row heights come in
+    # two sizes (expanded/collapsed) measured once on the first row built.
+    ROW_GAP = 6
+    SCROLL_UNIT = 30
+
+    def __init__(self, parent, regions, on_change, on_remove, limits, on_alerts=None):
+        self.regions = regions
+        self.on_change = on_change
+        self.on_remove = on_remove
+        self.on_alerts = on_alerts
+        self.limits = limits
+        self.canvas = tk.Canvas(parent, borderwidth=0, highlightthickness=0)
+        self.scrollbar = ttk.Scrollbar(parent, orient="vertical", command=self.yview)
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas.bind("<Configure>", lambda e: self.refresh())
+
+        self.top = 0
+        self.rows = {}  # region index -> bound row
+        self.free = []
+        self.rows_built = 0
+        self.collapsed = set()  # region ids
+        self.heights = None
+        self.offsets = [0]
+        self._reload_after = None
+
+    def new_row(self):
+        row = RegionRow(self.canvas, self.on_change, self.on_remove, self.toggle_collapsed, self.limits, self.on_alerts)
+        self.rows_built += 1
+        if self.heights is None:
+            row.frame.update_idletasks()
+            expanded = row.frame.winfo_reqheight()
+            row.set_collapsed(True)
+            row.frame.update_idletasks()
+            self.heights = (expanded, row.frame.winfo_reqheight())
+            row.set_collapsed(False)
+        return row
+
+    def row_height(self, region):
+        if self.heights is None: return 0
+        return self.heights[1] if region.id in self.collapsed else self.heights[0]
+
+    def layout(self):
+        offsets = [0]
+        for r in self.regions:
+            offsets.append(offsets[-1] + self.row_height(r) + self.ROW_GAP)
+        self.offsets = offsets
+
+    def total_height(self):
+        return self.offsets[-1]
+
+    def reload(self):
+        # regions were added, removed or collapsed; bursts fold into one pass
+        if self._reload_after is None:
+            self._reload_after = self.canvas.after_idle(self._reload)
+
+    def _reload(self):
+        self._reload_after = None
+        for row in self.rows.values():
+            row.unbind()
+            self.free.append(row)
+        self.rows = {}
+        if self.heights is None and self.regions:
+            self.free.append(self.new_row())
+        self.layout()
+        self.refresh()
+
+    def visible_range(self):
+        view_h = max(1, self.canvas.winfo_height())
+        first = max(0, bisect.bisect_right(self.offsets, self.top) - 1)
+        last = min(len(self.regions), bisect.bisect_left(self.offsets, self.top + view_h))
+        return first, last
+
+    def refresh(self):
+        if len(self.offsets) != len(self.regions) + 1:
+            self.reload()
+            return
+        self.top = max(0, min(self.top, self.total_height() - self.canvas.winfo_height()))
+        first, last = self.visible_range()
+        for index in [i for i in self.rows if not first <= i < last]:
+            row = self.rows.pop(index)
+            row.unbind()
+            self.free.append(row)
+        for index in range(first, last):
+            row = self.rows.get(index)
+            if row is None:
+                row = self.free.pop() if self.free else self.new_row()
+                region = self.regions[index]
+                row.bind(region, index, region.id in self.collapsed)
+                self.rows[index] = row
+            row.frame.place(x=2, y=self.offsets[index] - self.top, relwidth=1.0, width=-4)
+        self.update_scrollbar()
+
+    def update_scrollbar(self):
+        total = self.total_height()
+        if total <= 0:
+            self.scrollbar.set(0, 1)
+            return
+        view_h = self.canvas.winfo_height()
+        self.scrollbar.set(self.top / total, min(1.0, (self.top + view_h) / total))
+
+    def yview(self, *args):
+        if args[0] == 'moveto':
+            self.scroll_to(float(args[1]) * self.total_height())
+        elif args[0] == 'scroll':
+            step = self.canvas.winfo_height() if args[2] == 'pages' else self.SCROLL_UNIT
+            self.scroll_to(self.top + int(args[1]) * step)
+
+    def scroll_to(self, y):
+        self.top = int(y)
+        self.refresh()
+
+    def see(self, index):
+        if not 0 <= index < len(self.regions) or len(self.offsets) != len(self.regions) + 1: return
+        view_h = self.canvas.winfo_height()
+        if self.offsets[index] < self.top:
+            self.scroll_to(self.offsets[index])
+        elif self.offsets[index + 1] > self.top + view_h:
+            self.scroll_to(self.offsets[index + 1] - view_h)
+
+    def toggle_collapsed(self, region):
+        self.collapsed ^= {region.id}
+        self.layout()
+        for row in self.rows.values():
+            row.set_collapsed(row.region.id in self.collapsed)
+        self.refresh()
+
+    def forget(self, region):
+        self.collapsed.discard(region.id)
+
+    def set_limits(self, width, height):
+        self.limits = (width, height)
+        for row in list(self.rows.values()) + self.free:
+            row.set_limits(width, height)
+
+
+class HistoryWindow:
+    # Scrubs back through FrameHistory one stored frame at a time.
+    def __init__(self, root, history, names, zooms):
+        self.history = history
+        self.names = names
+        self.zooms = zooms
+        self.ids = [rid for rid in history.region_ids() if rid in names]
+        self.region_id = None
+        self.times = []
+        self.now = time.perf_counter()
+        self.photo = None
+
+        self.win = tk.Toplevel(root)
+        self.win.title("History")
+        self.win.attributes('-topmost', True)
+        top = tk.Frame(self.win)
+        top.pack(fill="x", padx=5, pady=5)
+        self.combo = ttk.Combobox(top, values=[names[rid] for rid in self.ids], state="readonly", width=12)
+        self.combo.pack(side="left")
+        self.combo.bind("<<ComboboxSelected>>", lambda e: self.select(self.ids[self.combo.current()]))
+        self.pos_var = tk.StringVar(value="no history yet")
+        ttk.Label(top, textvariable=self.pos_var, width=26).pack(side="left", padx=5)
+        ttk.Button(top, text="Export...", command=self.export).pack(side="right")
+        ttk.Button(top, text="Refresh", command=lambda: self.select(self.region_id)).pack(side="right", padx=5)
+        self.scale = ttk.Scale(self.win, from_=0, to=0, orient='horizontal', command=lambda v: self.show())
+        self.scale.pack(fill="x", padx=5)
+        self.label = tk.Label(self.win, bg='black', borderwidth=0)
+        self.label.pack(padx=5, pady=5)
+        self.win.bind('<Left>', lambda e: self.step(-1))
+        self.win.bind('<Right>', lambda e: self.step(1))
+
+        if self.ids:
+            self.combo.current(0)
+            self.select(self.ids[0])
+
+    def select(self, region_id):
+        if region_id is None: return
+        self.region_id = region_id
+        self.times = self.history.timestamps(region_id)
+        self.now = time.perf_counter()
+        self.scale.configure(to=max(0, len(self.times) - 1))
+        self.scale.set(max(0, len(self.times) - 1))
+        self.show()
+
+    def step(self, delta):
+        self.scale.set(min(max(0, round(self.scale.get()) + delta), max(0, len(self.times) - 1)))
+        self.show()
+
+    def show(self):
+        if not self.times: return
+        index = min(round(self.scale.get()), len(self.times) - 1)
+        frame = self.history.frame_at(self.region_id, self.times[index])
+        if frame is None:
+            self.pos_var.set("evicted, press Refresh")
+            return
+        rect, raw, ts = frame
+        size = (rect[2], rect[3])
+        image = Image.frombuffer("RGB", size, raw, "raw", "BGRX", 0, 1)
+        image = image.resize(zoomed_size(size[0], size[1], self.zooms.get(self.region_id, 1.0)), Image.NEAREST)
+        self.photo = ImageTk.PhotoImage(image)
+        self.label.config(image=self.photo)
+        self.pos_var.set(f"{index + 1}/{len(self.times)}  {self.now - ts:.1f} s ago")
+
+    def export(self):
+        if self.region_id is None: return
+        path = filedialog.asksaveasfilename(
+            parent=self.win, defaultextension=".bbzr", initialfile=f"region{self.region_id}.bbzr",
+            filetypes=[("Buff Bar Zoom replay", "*.bbzr"), ("All files", "*.*")]
+        )
+        if not path: return
+        try:
+            count = self.history.export(self.region_id, path)
+            self.pos_var.set(f"exported {count} frames")
+        except OSError as e:
+            # shown in the window, the packaged app has no console
+            self.pos_var.set(f"export failed: {e.strerror or e}")
+
+
+class TriggerWindow:
+    # Edits one region's alert rules. Diff and template rules take their
+    # snapshot from a fresh grab of the region when they are added.
+    def __init__(self, root, region, title, grab, on_change):
+        self.region = region
+        self.grab = grab
+        self.on_change = on_change
+
+        self.win = tk.Toplevel(root)
+        self.win.title(f"Alerts - {title}")
+        self.win.attributes('-topmost', True)
+        self.listbox = tk.Listbox(self.win, height=6, exportselection=False)
+        self.listbox.pack(fill="x", padx=5, pady=5)
+
+        self.vars = {
+            'kind': tk.StringVar(value="template"),
+            'action': tk.StringVar(value="sound"),
+            'invert': tk.BooleanVar(value=False),
+            'name': tk.StringVar(value=""),
+            'rect': tk.StringVar(value=""),
+            'color': tk.StringVar(value="#ffffff"),
+            'tolerance': tk.IntVar(value=32),
+            'threshold': tk.DoubleVar(value=0.1),
+        }
+        form = ttk.LabelFrame(self.win, text="New rule")
+        form.pack(fill="x", padx=5)
+        row = tk.Frame(form)
+        row.pack(fill="x", pady=2)
+        ttk.Combobox(row, textvariable=self.vars['kind'], values=TriggerRule.KINDS, state="readonly", width=9).pack(side="left", padx=2)
+        ttk.Checkbutton(row, text="Invert", variable=self.vars['invert']).pack(side="left", padx=5)
+        ttk.Label(row, text="Action").pack(side="left")
+        ttk.Combobox(row, textvariable=self.vars['action'], values=TriggerRule.ACTIONS, state="readonly", width=6).pack(side="left", padx=2)
+        ttk.Entry(row, textvariable=self.vars['name'], width=12).pack(side="right", padx=2)
+        ttk.Label(row, text="Name").pack(side="right")
+        row = tk.Frame(form)
+        row.pack(fill="x", pady=2)
+        ttk.Label(row, text="Rect (x y w h)").pack(side="left", padx=2)
+        ttk.Entry(row, textvariable=self.vars['rect'], width=14).pack(side="left", padx=2)
+        ttk.Entry(row, textvariable=self.vars['color'], width=8).pack(side="right", padx=2)
+        ttk.Label(row, text="Color").pack(side="right")
+        row = tk.Frame(form)
+        row.pack(fill="x", pady=2)
+        ttk.Label(row, text="Threshold").pack(side="left", padx=2)
+        ttk.Spinbox(row, from_=0.0, to=1.0, increment=0.05, textvariable=self.vars['threshold'], width=5).pack(side="left", padx=2)
+        ttk.Spinbox(row, from_=0, to=255, increment=4, textvariable=self.vars['tolerance'], width=4).pack(side="right", padx=2)
+        ttk.Label(row, text="Tolerance").pack(side="right")
+
+        btns = tk.Frame(self.win)
+        btns.pack(fill="x", padx=5, pady=5)
+        add_btn = ttk.Button(btns, text="Add", command=self.add)
+        add_btn.pack(side="left")
+        ttk.Button(btns, text="Remove", command=self.remove).pack(side="left", padx=5)
+        ttk.Button(btns, text="Re-snapshot", command=self.resnapshot).pack(side="left")
+        self.status_var = tk.StringVar(value="")
+        ttk.Label(self.win, textvariable=self.status_var).pack(fill="x", padx=5, pady=(0, 5))
+        if np is None:
+            add_btn.state(['disabled'])
+            self.status_var.set("Alerts need numpy")
+        self.refresh()
+
+    def describe(self, data):
+        kind = data.get('kind', 'diff') + (" (inverted)" if data.get('invert') else "")
+        return f"{data.get('name') or data.get('kind', 'diff')}: {kind} -> {data.get('action', 'log')}"
+
+    def refresh(self):
+        self.listbox.delete(0, "end")
+        for data in self.region.triggers:
+            self.listbox.insert("end", self.describe(data))
+
+    def read_form(self):
+        try:
+            rect = [int(v) for v in self.vars['rect'].get().replace(",", " ").split()]
+            color = self.vars['color'].get().strip()
+            int(color.lstrip('#'), 16)
+            if (rect and len(rect) != 4) or len(color.lstrip('#')) != 6: raise ValueError
+            data = {
+                'kind': self.vars['kind'].get(),
+                'action': self.vars['action'].get(),
+                'invert': self.vars['invert'].get(),
+                'threshold': min(1.0, max(0.0, self.vars['threshold'].get())),
+            }
+            if data['kind'] == 'color':
+                data['color'] = color
+                data['tolerance'] = self.vars['tolerance'].get()
+        except (tk.TclError, ValueError):
+            self.status_var.set("Rect is x y w h in region pixels, color is #rrggbb")
+            return None
+        if self.vars['name'].get().strip():
+            data['name'] = self.vars['name'].get().strip()
+        if rect:
+            data['rect'] = rect
+        return data
+
+    def take_snapshot(self, data):
+        if data['kind'] == 'color': return True
+        sig = self.grab()
+        if sig is None:
+            self.status_var.set("Capture failed")
+            return False
+        cells = TriggerRule(data).snapshot_cells(sig)
+        if not cells.size:
+            self.status_var.set("Rect is outside the region")
+            return False
+        data['snapshot'] = encode_cells(cells)
+        return True
+
+    def selected(self):
+        sel = self.listbox.curselection()
+        return sel[0] if sel and sel[0] < len(self.region.triggers) else None
+
+    def add(self):
+        data = self.read_form()
+        if data is None or not self.take_snapshot(data): return
+        self.region.triggers.append(data)
+        self.changed(f"Added {self.describe(data)}")
+
+    def remove(self):
+        index = self.selected()
+        if index is None: return
+        del self.region.triggers[index]
+        self.changed("Removed")
+
+    def resnapshot(self):
+        index = self.selected()
+        if index is None or not self.take_snapshot(self.region.triggers[index]): return
+        self.changed("Snapshot updated")
+
+    def changed(self, message):
+        self.on_change(self.region)
+        self.refresh()
+        self.status_var.set(message)
+
+
+class StartupProfile:
+    # Wall time per startup phase for --profile-startup. mark() closes the
+    # phase running since the previous mark; add() records one measured
+    # elsewhere (e.g. the deferred setup panel).
+    def __init__(self, enabled=False, start=None):
+        self.enabled = enabled
+        self.start = start or time.perf_counter()
+        self.last = self.start
+        self.phases = []
+        self.reported = False
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last))
+        self.last = now
+
+    def add(self, name, seconds):
+        self.phases.append((name, seconds))
+        if self.reported:
+            self.write([f"{name:<18}{seconds * 1000:>8.1f} ms"])
+
+    def report(self, title):
+        if not self.enabled or self.reported: return
+        self.reported = True
+        lines = [f"{name:<18}{seconds * 1000:>8.1f} ms" for name, seconds in self.phases]
+        lines.append(f"{title:<18}{(self.last - self.start) * 1000:>8.1f} ms")
+        lines.extend(f"  import {name:<9}{seconds * 1000:>8.1f} ms, within the phase it ran in" for name, seconds in LAZY_IMPORTS)
+        self.write(lines)
+
+    def write(self, lines):
+        if not self.enabled: return
+        text = "\n".join(lines)
+        # a windowed build has no console
+        if sys.stdout is not None:
+            print(text)
+        try:
+            with open(STARTUP_LOG, 'a') as f:
+                f.write(text + "\n")
+        except OSError:
+            pass
+
+
+class BuffMirrorApp:
+    def __init__(self, source_factory=None, start_running=False, profile=None):
+        # Startup only builds what the first frame needs. In Run mode that is
+        # the mirror windows; the setup panel and overlay are built the first
+        # time Setup or Preview is opened, hotkeys once a frame is on screen.
+        self.profile = profile or StartupProfile()
         self.root = tk.Tk()
         self.root.title("Buff Bar Zoom")
         self.root.geometry("500x950")
         self.root.attributes('-topmost', True)
         self.root.protocol("WM_DELETE_WINDOW", self.quit_app)
+        self.profile.mark("tk root")
 
-        self.sct = mss.mss()
-        self.monitors = self.sct.monitors[1:]
+        loaded_data = self.load_settings()
+        start_running = start_running or loaded_data.get('start_running', False)
+        if start_running:
+            self.root.withdraw()
+        self.profile.mark("settings")
+
+        source_factory = source_factory or MssSource
+        with source_factory() as probe:
+            self.monitors = probe.monitors[1:]
+        self.pipeline = CapturePipeline(self.monitors, source_factory)
+        self.profile.mark("monitors")
         
         self.current_mon_idx = 0 
         self.monitor_offset_x = self.monitors[0]['left']
@@ -34,12 +2587,54 @@ class BuffMirrorApp:
         self.mode = "SETUP" 
         self.running_thread = True
         self.mirror_windows = []
+        self.mirror_by_key = {}
+        self._reconcile_after = None
         self.regions = []
+        self.overlay_items = {}
+        self.next_region_id = 1
+        self._spec = None
+        self._spec_dirty = True
+        self._present_fps = 30
+        self.pending_buffers = set()
+        self.present_scheduler = FrameScheduler(60)
+        self.setup_built = False
+        self.startup_done = False
+        self.status_var = tk.StringVar(value="")
+        self.hotkey_error = ""
+        self.start_running = tk.BooleanVar(value=loaded_data.get('start_running', False))
 
-        loaded_data = self.load_settings()
-        
         self.fps = tk.IntVar(value=loaded_data.get('fps', 30))
         self.separate = tk.BooleanVar(value=loaded_data.get('separate', False))
+        self.coalesce = tk.BooleanVar(value=loaded_data.get('coalesce', True))
+        self.skip_unchanged = tk.BooleanVar(value=loaded_data.get('skip_unchanged', True))
+        self.change_threshold = tk.DoubleVar(value=loaded_data.get('change_threshold', 0.0))
+        self.multicore = tk.BooleanVar(value=loaded_data.get('multicore', False) and np is not None)
+        self.pipeline.pool_min_pixels = loaded_data.get('multicore_min_pixels', 1500000)
+        self.multicore_workers = loaded_data.get('multicore_workers', 0)
+        self.shared_output = tk.BooleanVar(value=loaded_data.get('shared_output', False))
+        self.use_numpy = tk.BooleanVar(value=loaded_data.get('engine', "pil") == "numpy" and np is not None)
+        self.pipeline.detector.sample_step = loaded_data.get('change_step', 1)
+        self.window_positions = loaded_data.get('window_positions', {})
+        self.idle_backoff = tk.BooleanVar(value=loaded_data.get('idle_backoff', True))
+        self.idle_after = tk.DoubleVar(value=loaded_data.get('idle_after', 10.0))
+        self.idle_floor = tk.IntVar(value=loaded_data.get('idle_floor_fps', 2))
+        self.game_window = tk.StringVar(value=loaded_data.get('game_window', ""))
+        for var in (self.idle_backoff, self.idle_after, self.idle_floor, self.game_window):
+            var.trace_add('write', self.apply_power_settings)
+        self.apply_power_settings()
+        self.keep_history = tk.BooleanVar(value=loaded_data.get('history', False))
+        self.history_mb = tk.IntVar(value=loaded_data.get('history_mb', 64))
+        self.history_seconds = tk.IntVar(value=loaded_data.get('history_seconds', 120))
+        for var in (self.keep_history, self.history_mb, self.history_seconds):
+            var.trace_add('write', self.apply_history_settings)
+        self.apply_history_settings()
+        self.shared_output.trace_add('write', self.apply_shared_output)
+        self.apply_shared_output()
+        self.multicore.trace_add('write', self.apply_multicore)
+        self.apply_multicore()
+        self.history_window = None
+        self.trigger_window = None
+        self.last_alert = ""
         idx = loaded_data.get('monitor_idx', 0)
         
         if 0 <= idx < len(self.monitors):
@@ -50,25 +2645,59 @@ class BuffMirrorApp:
             'run': tk.StringVar(value=loaded_data.get('key_run', 'f1')),
             'setup': tk.StringVar(value=loaded_data.get('key_setup', 'f2')),
             'preview': tk.StringVar(value=loaded_data.get('key_preview', 'f3')),
-            'quit': tk.StringVar(value=loaded_data.get('key_quit', 'f4'))
+            'quit': tk.StringVar(value=loaded_data.get('key_quit', 'f4')),
+            'wake': tk.StringVar(value=loaded_data.get('key_wake', 'f5'))
         }
         
         self.active_keys = {
             'run': self.key_vars['run'].get(),
             'setup': self.key_vars['setup'].get(),
             'preview': self.key_vars['preview'].get(),
-            'quit': self.key_vars['quit'].get()
+            'quit': self.key_vars['quit'].get(),
+            'wake': self.key_vars['wake'].get()
         }
 
         self.actions = {
             'run': lambda: self.root.after(0, self.set_running),
             'setup': lambda: self.root.after(0, self.set_setup),
             'preview': lambda: self.root.after(0, self.set_preview),
-            'quit': lambda: self.root.after(0, self.quit_app)
+            'quit': lambda: self.root.after(0, self.quit_app),
+            'wake': self.pipeline.wake
         }
 
-        self.separate.trace_add('write', self.rebuild_mirrors_callback)
+        self.separate.trace_add('write', self.reconcile_mirrors_callback)
+        for var in (self.fps, self.separate, self.coalesce, self.skip_unchanged, self.change_threshold, self.use_numpy):
+            var.trace_add('write', self.invalidate_spec)
+
+        saved_regions = loaded_data.get('regions', [])
+        if saved_regions:
+            for r_data in saved_regions:
+                self.add_region(r_data)
+        else:
+            self.add_region({'x': 100, 'y': 100, 'w': 200, 'h': 50, 'on': True, 'zoom': 2.0})
+            self.add_region({'x': 350, 'y': 100, 'w': 50,  'h': 50, 'on': True, 'zoom': 2.0})
+        self.profile.mark("state")
+
+        if start_running:
+            self.mode = "RUNNING"
+        else:
+            self.build_setup_ui()
+        self.reconcile_mirror_windows()
+        self.profile.mark("mirror windows")
+        self.update_mirror_loop()
+        self.update_status_loop()
+        if start_running:
+            self.pipeline.start()
+            # hotkeys and the profile report wait for the first frame, or
+            # this long if nothing is enabled to capture
+            self.root.after(2000, lambda: self.finish_startup("no frame yet"))
+        else:
+            self.root.after_idle(lambda: self.finish_startup("setup shown"))
 
+    def build_setup_ui(self):
+        if self.setup_built: return
+        self.setup_built = True
+        t0 = time.perf_counter()
         self.overlay = tk.Toplevel(self.root)
         self.overlay.attributes('-alpha', 0.5, '-topmost', True, '-transparentcolor', '#000001')
         self.overlay.overrideredirect(True)
@@ -76,20 +2705,129 @@ class BuffMirrorApp:
         self.overlay_canvas.pack(fill="both", expand=True)
 
         self.create_main_layout()
-        
-        saved_regions = loaded_data.get('regions', [])
-        if saved_regions:
-            for r_data in saved_regions:
-                self.add_region_ui(r_data)
+        for region in self.regions:
+            self.create_overlay_items(region)
+        self.refresh_region_titles()
+        self.update_overlay_geometry()
+        self.update_overlay_visibility()
+        self.profile.add("setup ui", time.perf_counter() - t0)
+        self.profile.last = time.perf_counter()
+
+    def finish_startup(self, phase):
+        if self.startup_done: return
+        self.startup_done = True
+        self.profile.mark(phase)
+        failed = self.apply_hotkeys_on_start()
+        self.profile.mark("hotkeys")
+        if failed:
+            self.hotkey_error = f"Hotkeys not bound: {', '.join(failed)}"
+            if self.mode == "RUNNING":
+                # the mirrors have no title bar; without hotkeys there would
+                # be no way back to setup or out of the app
+                self.set_setup()
+        self.profile.report("total")
+
+    def apply_power_settings(self, *args):
+        idle = self.pipeline.idle
+        try:
+            idle.enabled = self.idle_backoff.get()
+            idle.idle_after = max(1.0, self.idle_after.get())
+            idle.floor_fps = max(1, self.idle_floor.get())
+        except tk.TclError:
+            return  # half-typed value in a spinbox
+        idle.game_window = self.game_window.get().strip()
+        self.pipeline.wake()
+
+    def apply_history_settings(self, *args):
+        history = self.pipeline.history
+        try:
+            history.budget = max(1, self.history_mb.get()) * 2**20
+            history.max_age = max(1, self.history_seconds.get())
+        except tk.TclError:
+            return  # half-typed value in a spinbox
+        history.enabled = self.keep_history.get()
+        if not history.enabled:
+            history.clear()
+
+    def apply_shared_output(self, *args):
+        sink = self.pipeline.sink
+        if self.shared_output.get():
+            if sink is None:
+                self.pipeline.sink = SharedFrameSink()
+                self.pipeline.request_refresh()
+        elif sink is not None:
+            self.pipeline.sink = None
+            sink.close()
+
+    def apply_multicore(self, *args):
+        # the capture thread starts or stops the pool on its next tick
+        if self.multicore.get():
+            self.pipeline.pool_workers = self.multicore_workers or max(1, (os.cpu_count() or 2) - 1)
         else:
-            self.add_region_ui({'x': 100, 'y': 100, 'w': 200, 'h': 50, 'on': True, 'zoom': 2.0})
-            self.add_region_ui({'x': 350, 'y': 100, 'w': 50,  'h': 50, 'on': True, 'zoom': 2.0})
+            self.pipeline.pool_workers = 0
 
-        self.update_overlay_geometry()
-        self.apply_hotkeys_on_start()
-        self.rebuild_mirror_windows()
-        self.update_overlay_loop()
-        self.update_mirror_loop()
+    def open_history(self):
+        if self.history_window is not None and self.history_window.win.winfo_exists():
+            self.history_window.win.lift()
+            return
+        names = {r.id: f"Region {i+1}" for i, r in enumerate(self.regions)}
+        zooms = {r.id: r.zoom for r in self.regions}
+        self.history_window = HistoryWindow(self.root, self.pipeline.history, names, zooms)
+
+    def open_alerts(self, region):
+        if self.trigger_window is not None and self.trigger_window.win.winfo_exists():
+            if self.trigger_window.region is region:
+                self.trigger_window.win.lift()
+                return
+            self.trigger_window.win.destroy()
+        title = f"Region {self.regions.index(region) + 1}"
+        self.trigger_window = TriggerWindow(self.root, region, title, lambda: self.grab_signature(region),
+                                            self.apply_triggers)
+
+    def apply_triggers(self, region):
+        self.pipeline.triggers.set_rules(region.id, region.triggers)
+
+    def grab_signature(self, region):
+        # one-off grab on the Tk thread, so snapshots work in Setup too; the
+        # overlay is hidden first because its outline sits on the region edge
+        rect = (self.monitor_offset_x + region.x, self.monitor_offset_y + region.y, region.w, region.h)
+        self.overlay.withdraw()
+        self.root.update()
+        try:
+            with self.pipeline.source_factory() as source:
+                return Signature(BatchedCapture(source, self.monitors).grab([rect])[0])
+        except Exception as e:
+            self.pipeline.instr.error("snapshot", e)
+            return None
+        finally:
+            self.update_overlay_visibility()
+
+    def fire_alert(self, timestamp, region_id, rule):
+        index = next((i for i, r in enumerate(self.regions) if r.id == region_id), None)
+        if index is None: return
+        line = f"{time.strftime('%H:%M:%S', time.localtime(timestamp))} Region {index + 1}: {rule.name}"
+        self.last_alert = line
+        if rule.action == 'sound':
+            if winsound is not None:
+                winsound.MessageBeep()
+            else:
+                self.root.bell()
+        elif rule.action == 'flash':
+            mirror = self.mirror_by_key.get(str(region_id) if self.separate.get() else "combined")
+            if mirror:
+                self.flash_window(mirror[0], 5)
+        else:
+            try:
+                with open(TRIGGER_LOG, 'a') as f:
+                    f.write(line + "\n")
+            except OSError as e:
+                print(f"Alert log failed: {e}")
+
+    def flash_window(self, win, count):
+        if not win.winfo_exists(): return
+        win.attributes('-alpha', 0.25 if count % 2 else 1.0)
+        if count > 0:
+            self.root.after(120, lambda: self.flash_window(win, count - 1))
 
     def update_monitor_vars(self, index):
         m = self.monitors[index]
@@ -101,9 +2839,7 @@ class BuffMirrorApp:
     def update_overlay_geometry(self):
         geo = f"{self.screen_width}x{self.screen_height}+{self.monitor_offset_x}+{self.monitor_offset_y}"
         self.overlay.geometry(geo)
-        for r in self.regions:
-            if r['scale_x']: r['scale_x'].configure(to=self.screen_width)
-            if r['scale_y']: r['scale_y'].configure(to=self.screen_height)
+        self.region_list.set_limits(self.screen_width, self.screen_height)
 
     def on_monitor_change(self, event):
         idx = self.monitor_combo.current()
@@ -111,6 +2847,7 @@ class BuffMirrorApp:
             self.current_mon_idx = idx
             self.update_monitor_vars(idx)
             self.update_overlay_geometry()
+            self.invalidate_spec()
 
     def create_main_layout(self):
         top_frame = tk.Frame(self.root)
@@ -131,38 +2868,78 @@ class BuffMirrorApp:
         self.create_kb_row(kb_frame, "Setup:", "setup")
         self.create_kb_row(kb_frame, "Preview:", "preview")
         self.create_kb_row(kb_frame, "Quit:", "quit")
+        self.create_kb_row(kb_frame, "Wake:", "wake")
 
         set_frame = ttk.LabelFrame(top_frame, text="Global Settings")
         set_frame.pack(fill="x", pady=5)
         ttk.Label(set_frame, text="FPS:").pack(side="left", padx=5)
         ttk.Spinbox(set_frame, from_=1, to=144, textvariable=self.fps, width=5).pack(side="left")
         ttk.Checkbutton(set_frame, text="Separate Windows", variable=self.separate).pack(side="right", padx=5)
+        ttk.Checkbutton(set_frame, text="Shared Output", variable=self.shared_output).pack(side="right", padx=5)
+        ttk.Checkbutton(set_frame, text="Start Running", variable=self.start_running).pack(side="right", padx=5)
+
+        perf_frame = ttk.LabelFrame(top_frame, text="Performance")
+        perf_frame.pack(fill="x", pady=5)
+        ttk.Checkbutton(perf_frame, text="Batch Capture", variable=self.coalesce).pack(side="left", padx=5)
+        ttk.Checkbutton(perf_frame, text="Skip Unchanged", variable=self.skip_unchanged).pack(side="left", padx=5)
+        ttk.Label(perf_frame, text="Threshold:").pack(side="left", padx=(5, 0))
+        ttk.Spinbox(perf_frame, from_=0.0, to=1.0, increment=0.05, textvariable=self.change_threshold, width=5).pack(side="left")
+        numpy_cb = ttk.Checkbutton(perf_frame, text="NumPy Engine", variable=self.use_numpy)
+        numpy_cb.pack(side="right", padx=5)
+        multicore_cb = ttk.Checkbutton(set_frame, text="Multi-core", variable=self.multicore)
+        multicore_cb.pack(side="right", padx=5)
+        if np is None:
+            numpy_cb.state(['disabled'])
+            multicore_cb.state(['disabled'])
+
+        power_frame = ttk.LabelFrame(top_frame, text="Power")
+        power_frame.pack(fill="x", pady=5)
+        power_row = tk.Frame(power_frame)
+        power_row.pack(fill="x")
+        ttk.Checkbutton(power_row, text="Idle Backoff", variable=self.idle_backoff).pack(side="left", padx=5)
+        ttk.Label(power_row, text="After (s):").pack(side="left", padx=(5, 0))
+        ttk.Spinbox(power_row, from_=1, to=600, textvariable=self.idle_after, width=5).pack(side="left")
+        ttk.Label(power_row, text="Floor FPS:").pack(side="left", padx=(5, 0))
+        ttk.Spinbox(power_row, from_=1, to=30, textvariable=self.idle_floor, width=4).pack(side="left")
+        game_row = tk.Frame(power_frame)
+        game_row.pack(fill="x", pady=2)
+        ttk.Label(game_row, text="Pause unless focused:").pack(side="left", padx=5)
+        ttk.Entry(game_row, textvariable=self.game_window).pack(side="left", fill="x", expand=True, padx=5)
+
+        hist_frame = ttk.LabelFrame(top_frame, text="History")
+        hist_frame.pack(fill="x", pady=5)
+        ttk.Checkbutton(hist_frame, text="Keep History", variable=self.keep_history).pack(side="left", padx=5)
+        ttk.Label(hist_frame, text="Seconds:").pack(side="left", padx=(5, 0))
+        ttk.Spinbox(hist_frame, from_=10, to=600, textvariable=self.history_seconds, width=4).pack(side="left")
+        ttk.Label(hist_frame, text="MB:").pack(side="left", padx=(5, 0))
+        ttk.Spinbox(hist_frame, from_=8, to=1024, textvariable=self.history_mb, width=5).pack(side="left")
+        ttk.Button(hist_frame, text="Scrub...", command=self.open_history).pack(side="right", padx=5)
+
+        self.show_stats = tk.BooleanVar(value=False)
+        ttk.Checkbutton(perf_frame, text="Stats", variable=self.show_stats, command=self.toggle_stats).pack(side="right", padx=5)
+        self.stats_frame = ttk.LabelFrame(top_frame, text="Stats (ms: p50 / p95 / p99)")
+        self.stats_var = tk.StringVar(value="")
+        tk.Label(self.stats_frame, textvariable=self.stats_var, font=("Courier", 8), anchor="w", justify="left").pack(fill="x", padx=5)
+        stats_btns = tk.Frame(self.stats_frame)
+        stats_btns.pack(fill="x", pady=2)
+        ttk.Button(stats_btns, text="Export JSONL", command=self.export_stats).pack(side="left", padx=5)
+        ttk.Button(stats_btns, text="Reset", command=self.pipeline.instr.reset).pack(side="left")
 
         self.canvas_frame = tk.Frame(self.root)
         self.canvas_frame.pack(fill="both", expand=True, padx=5)
 
-        self.canvas = tk.Canvas(self.canvas_frame, borderwidth=0, highlightthickness=0)
-        self.scrollbar = ttk.Scrollbar(self.canvas_frame, orient="vertical", command=self.canvas.yview)
-        self.scrollable_frame = tk.Frame(self.canvas)
-
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-        )
-
-        self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw", width=460)
-        self.canvas.configure(yscrollcommand=self.scrollbar.set)
-        self.canvas.pack(side="left", fill="both", expand=True)
-        self.scrollbar.pack(side="right", fill="y")
-        self.canvas.bind_all("<MouseWheel>", self._on_mousewheel)
+        self.region_list = RegionListView(self.canvas_frame, self.regions, self.on_region_var, self.remove_region,
+                                          (self.screen_width, self.screen_height), self.open_alerts)
+        self.region_list.canvas.bind_all("<MouseWheel>", self._on_mousewheel)
 
         btn_frame = tk.Frame(self.root, pady=5)
         btn_frame.pack(fill="x")
-        ttk.Button(btn_frame, text="+ Add New Region", command=lambda: self.add_region_ui(None)).pack(fill="x", padx=10)
+        ttk.Button(btn_frame, text="+ Add New Region", command=self.add_new_region).pack(fill="x", padx=10)
+        tk.Label(self.root, textvariable=self.status_var, font=("Arial", 8), anchor="w", justify="left").pack(fill="x", padx=10)
         tk.Label(self.root, text="discord - spctrl, Roblox - 45LEGEND_X", font=("Arial", 8), fg="gray").pack(pady=2)
 
     def _on_mousewheel(self, event):
-        self.canvas.yview_scroll(int(-1*(event.delta/120)), "units")
+        self.region_list.yview('scroll', int(-1*(event.delta/120)), "units")
 
     def create_kb_row(self, parent, label_text, var_name):
         row = tk.Frame(parent)
@@ -173,104 +2950,74 @@ class BuffMirrorApp:
         entry.bind('<Return>', lambda e, name=var_name: self.update_single_hotkey(name, entry))
         entry.bind('<FocusOut>', lambda e, name=var_name: self.update_single_hotkey(name, entry))
 
-    def add_region_ui(self, data=None):
-        if data is None:
-            data = {'x': 100, 'y': 100, 'w': 100, 'h': 50, 'on': True, 'zoom': 2.0}
-
-        r_vars = {
-            'x': tk.IntVar(value=data['x']),
-            'y': tk.IntVar(value=data['y']),
-            'w': tk.IntVar(value=data['w']),
-            'h': tk.IntVar(value=data['h']),
-            'on': tk.BooleanVar(value=data['on']),
-            'zoom': tk.DoubleVar(value=data['zoom']),
-            'scale_x': None,
-            'scale_y': None,
-            'ui_frame': None
-        }
-        
-        r_vars['on'].trace_add('write', self.rebuild_mirrors_callback)
-        
-        lf = ttk.LabelFrame(self.scrollable_frame, text="", padding=2)
-        lf.pack(fill="x", pady=3, padx=2)
-        r_vars['ui_frame'] = lf
-
-        header = tk.Frame(lf)
-        header.pack(fill="x", pady=0)
-        
-        cb = ttk.Checkbutton(header, text="Enable", variable=r_vars['on'])
-        cb.pack(side="left")
-
-        btn_del = ttk.Button(header, text="X", width=3, command=lambda: self.remove_region(r_vars))
-        btn_del.pack(side="right", padx=2)
-
-        is_minimized = [False] 
-        content_frame = tk.Frame(lf)
-        
-        def toggle_minimize():
-            if is_minimized[0]:
-                content_frame.pack(fill="x", pady=2)
-                btn_min.config(text="[-]")
-                is_minimized[0] = False
-            else:
-                content_frame.pack_forget()
-                btn_min.config(text="[+]")
-                is_minimized[0] = True
-
-        btn_min = ttk.Button(header, text="[-]", width=3, command=toggle_minimize)
-        btn_min.pack(side="right", padx=2)
-
-        content_frame.pack(fill="x", pady=2)
-
-        r_vars['scale_x'] = self.make_slider(content_frame, "X", r_vars['x'], self.screen_width)
-        r_vars['scale_y'] = self.make_slider(content_frame, "Y", r_vars['y'], self.screen_height)
-        self.make_slider(content_frame, "W", r_vars['w'], 800)
-        self.make_slider(content_frame, "H", r_vars['h'], 300)
-        self.make_zoom_slider(content_frame, "Zoom", r_vars['zoom'])
-
-        self.regions.append(r_vars)
+    def add_region(self, data=None):
+        # saved ids are kept so window positions stay attached to their region
+        region_id = (data or {}).get('id')
+        if not isinstance(region_id, int) or any(r.id == region_id for r in self.regions):
+            region_id = self.next_region_id
+        self.next_region_id = max(self.next_region_id, region_id + 1)
+        region = Region(region_id, data)
+        self.regions.append(region)
+        if self.setup_built:
+            self.create_overlay_items(region)
+        self.apply_triggers(region)
+        self.invalidate_spec()
         self.refresh_region_titles()
-        self.rebuild_mirrors_callback()
+        self.reconcile_mirrors_callback()
+        return region
 
-    def remove_region(self, region_dict):
-        if region_dict['ui_frame']:
-            region_dict['ui_frame'].destroy()
+    def add_new_region(self):
+        self.add_region(None)
+        self.root.after_idle(lambda: self.region_list.see(len(self.regions) - 1))
+
+    def on_region_var(self, region, key, var):
+        try:
+            changed = region.set(key, var.get())
+        except (tk.TclError, ValueError):
+            return  # half-typed value in an entry
+        if not changed: return
+        self.invalidate_spec()
+        if key in ('x', 'y', 'w', 'h', 'on'):
+            self.update_overlay_region(region)
+        if key == 'on':
+            self.reconcile_mirrors_callback()
+
+    def remove_region(self, region):
+        self.delete_overlay_items(region)
+        self.region_list.forget(region)
         
-        if region_dict in self.regions:
-            self.regions.remove(region_dict)
+        if region in self.regions:
+            self.regions.remove(region)
+        self.window_positions.pop(str(region.id), None)
+        self.pipeline.detector.forget({r.id for r in self.regions})
+        self.pipeline.history.forget({r.id for r in self.regions})
+        self.pipeline.triggers.forget({r.id for r in self.regions})
+        if self.trigger_window is not None and self.trigger_window.region is region and self.trigger_window.win.winfo_exists():
+            self.trigger_window.win.destroy()
+        if self.pipeline.sink is not None:
+            self.pipeline.sink.forget({r.id for r in self.regions})
         
+        self.invalidate_spec()
         self.refresh_region_titles()
-        self.rebuild_mirrors_callback()
+        self.reconcile_mirrors_callback()
 
     def refresh_region_titles(self):
+        if not self.setup_built: return
+        self.region_list.reload()
         for i, r in enumerate(self.regions):
-            if r['ui_frame']:
-                r['ui_frame'].configure(text=f"Region {i+1}")
-
-    def make_slider(self, parent, label, var, max_val):
-        frame = ttk.Frame(parent)
-        frame.pack(fill="x", padx=2, pady=1)
-        ttk.Label(frame, text=label, width=2).pack(side="left")
-        scale = ttk.Scale(frame, from_=0, to=max_val, variable=var, orient='horizontal')
-        scale.pack(side="left", fill="x", expand=True)
-        ttk.Entry(frame, textvariable=var, width=5).pack(side="right")
-        return scale
-
-    def make_zoom_slider(self, parent, label, var):
-        frame = ttk.Frame(parent)
-        frame.pack(fill="x", padx=2, pady=1)
-        ttk.Label(frame, text=label, width=5).pack(side="left")
-        scale = ttk.Scale(frame, from_=1.0, to=5.0, variable=var, orient='horizontal')
-        scale.pack(side="left", fill="x", expand=True)
-        ttk.Entry(frame, textvariable=var, width=5).pack(side="right")
-        return scale
+            for item in (self.overlay_items.get(r.id) or [])[2:]:
+                self.overlay_canvas.itemconfigure(item, text=f"R{i+1}")
 
     def apply_hotkeys_on_start(self):
+        # returns the keys that could not be bound
+        failed = []
         for name, key in self.active_keys.items():
             try:
                 keyboard.add_hotkey(key, self.actions[name])
             except Exception as e:
                 print(f"Failed to bind {key}: {e}")
+                failed.append(key)
+        return failed
 
     def update_single_hotkey(self, name, entry_widget):
         new_key = self.key_vars[name].get().strip().lower()
@@ -299,40 +3046,59 @@ class BuffMirrorApp:
             entry_widget.configure(foreground='red')
             self.root.after(1000, lambda: entry_widget.configure(foreground='black'))
 
-    def rebuild_mirrors_callback(self, *args):
-        self.root.after(10, self.rebuild_mirror_windows)
-
-    def rebuild_mirror_windows(self):
-        for win, lbl in self.mirror_windows:
-            win.destroy()
-        self.mirror_windows = []
-
-        active_indices = [i for i, r in enumerate(self.regions) if r['on'].get()]
-        if not active_indices: return
+    def reconcile_mirrors_callback(self, *args):
+        # traces often fire in bursts (a checkbox plus a spec change, loading
+        # many regions); they collapse into one reconcile pass
+        if self._reconcile_after is None:
+            self._reconcile_after = self.root.after(10, self.reconcile_mirror_windows)
 
+    def wanted_mirror_keys(self):
+        active = [str(r.id) for r in self.regions if r.on]
         if self.separate.get():
-            for idx in active_indices:
-                self.create_single_window(idx)
-        else:
-            self.create_single_window("combined")
-
-        if self.mode == "SETUP":
-            self.hide_mirrors()
-        else:
-            self.show_mirrors()
-
-    def create_single_window(self, tag):
+            return active
+        return ["combined"] if active else []
+
+    def reconcile_mirror_windows(self):
+        # Windows are keyed by region id ("combined" for the single window);
+        # only windows whose key appeared or vanished are created/destroyed,
+        # so the rest keep their position and contents.
+        self._reconcile_after = None
+        wanted = self.wanted_mirror_keys()
+        for key in [k for k in self.mirror_by_key if k not in wanted]:
+            win, _ = self.mirror_by_key.pop(key)
+            win.destroy()
+        for key in wanted:
+            if key not in self.mirror_by_key:
+                self.mirror_by_key[key] = self.create_single_window(key)
+
+        order = [self.mirror_by_key[key] for key in wanted]
+        if order == self.mirror_windows: return
+        # buffer i is shown in window i, so a changed set needs a full repaint
+        self.mirror_windows = order
+        self.pending_buffers.clear()
+        self.pipeline.request_refresh()
+
+    def create_single_window(self, key):
         win = tk.Toplevel(self.root)
         win.overrideredirect(True)
         win.attributes('-topmost', True)
+        pos = self.window_positions.get(key)
+        if pos:
+            win.geometry(f"+{pos[0]}+{pos[1]}")
         
         lbl = tk.Label(win, bg='black', borderwidth=0)
         lbl.pack()
         
         win.bind('<Button-1>', self.start_move)
         win.bind('<B1-Motion>', self.do_move)
+        win.bind('<ButtonRelease-1>', lambda e: self.remember_position(key, win))
         
-        self.mirror_windows.append((win, lbl))
+        if self.mode == "SETUP":
+            win.withdraw()
+        return (win, lbl)
+
+    def remember_position(self, key, win):
+        self.window_positions[key] = [win.winfo_x(), win.winfo_y()]
 
     def start_move(self, event):
         self.drag_win = event.widget.winfo_toplevel()
@@ -344,98 +3110,215 @@ class BuffMirrorApp:
         y = self.drag_win.winfo_y() + (event.y - self.win_y)
         self.drag_win.geometry(f"+{x}+{y}")
 
-    def update_overlay_loop(self):
+    def update_overlay_visibility(self):
+        if not self.setup_built: return
         if self.mode in ["SETUP", "PREVIEW"]:
             self.overlay.deiconify()
-            self.overlay_canvas.delete("all")
-            
-            for i, r in enumerate(self.regions):
-                if r['on'].get():
-                    x, y = r['x'].get(), r['y'].get()
-                    w, h = r['w'].get(), r['h'].get()
-                    
-                    self.overlay_canvas.create_rectangle(x, y, x+w, y+h, outline='black', width=5)
-                    self.overlay_canvas.create_rectangle(x, y, x+w, y+h, outline='white', width=2)
-                    
-                    txt = f"R{i+1}"
-                    font_spec = ("Arial", 10, "bold")
-                    tx, ty = x, y-18
-                    for ox, oy in [(-1, -1), (-1, 1), (1, -1), (1, 1)]:
-                        self.overlay_canvas.create_text(tx+ox, ty+oy, text=txt, fill='black', font=font_spec, anchor="nw")
-                    self.overlay_canvas.create_text(tx, ty, text=txt, fill='white', font=font_spec, anchor="nw")
         else:
             self.overlay.withdraw()
-            
-        if self.running_thread:
-            self.root.after(50, self.update_overlay_loop)
+
+    def create_overlay_items(self, region):
+        # Canvas items are created once per region and only moved afterwards:
+        # two outline rectangles plus a label drawn with a 4-way black outline.
+        c = self.overlay_canvas
+        font_spec = ("Arial", 10, "bold")
+        items = [
+            c.create_rectangle(0, 0, 0, 0, outline='black', width=5),
+            c.create_rectangle(0, 0, 0, 0, outline='white', width=2),
+        ]
+        for _ in OVERLAY_TEXT_OFFSETS:
+            items.append(c.create_text(0, 0, text="", fill='black', font=font_spec, anchor="nw"))
+        items.append(c.create_text(0, 0, text="", fill='white', font=font_spec, anchor="nw"))
+        self.overlay_items[region.id] = items
+        self.update_overlay_region(region)
+
+    def update_overlay_region(self, region):
+        items = self.overlay_items.get(region.id)
+        if not items: return
+        x, y, w, h = region.x, region.y, region.w, region.h
+        c = self.overlay_canvas
+        c.coords(items[0], x, y, x+w, y+h)
+        c.coords(items[1], x, y, x+w, y+h)
+        tx, ty = x, y-18
+        for item, (ox, oy) in zip(items[2:], OVERLAY_TEXT_OFFSETS):
+            c.coords(item, tx+ox, ty+oy)
+        c.coords(items[-1], tx, ty)
+        state = 'normal' if region.on else 'hidden'
+        for item in items:
+            c.itemconfigure(item, state=state)
+
+    def delete_overlay_items(self, region):
+        items = self.overlay_items.pop(region.id, None)
+        if items:
+            self.overlay_canvas.delete(*items)
+
+    def invalidate_spec(self, *args):
+        self._spec_dirty = True
+
+    def current_spec(self):
+        # the present loop reads this cached snapshot; Tk variables are only
+        # read again after one of their traces has fired
+        if self._spec_dirty:
+            try:
+                self._spec = self.build_pipeline_spec()
+                self._spec_dirty = False
+                # frames arrive as fast as the fastest region is captured
+                self._present_fps = max([self._spec.fps] + [r.fps for r in self._spec.regions])
+            except tk.TclError:
+                pass  # half-typed global setting, keep the last good spec
+        return self._spec
+
+    def build_pipeline_spec(self):
+        return PipelineSpec(
+            build_region_specs(self.regions, self.monitor_offset_x, self.monitor_offset_y),
+            self.separate.get(),
+            self.coalesce.get(),
+            max(1, self.fps.get()),
+            self.skip_unchanged.get(),
+            min(1.0, max(0.0, self.change_threshold.get())),
+            "numpy" if self.use_numpy.get() else "pil"
+        )
 
     def update_mirror_loop(self):
+        # polls at twice the fastest capture rate so a finished frame waits
+        # at most half a period before it is shown
+        spec = self.current_spec()
+        self.present_scheduler.set_fps(2 * (self._present_fps if spec else 30))
+        self.present_scheduler.tick()
         if self.mode in ["RUNNING", "PREVIEW"] and self.mirror_windows:
             try:
-                active_regions = [r for r in self.regions if r['on'].get()]
-                captured_data = [] 
-                
-                for r in active_regions:
-                    global_left = self.monitor_offset_x + r['x'].get()
-                    global_top = self.monitor_offset_y + r['y'].get()
-                    
-                    monitor = {
-                        'top': global_top, 
-                        'left': global_left, 
-                        'width': r['w'].get(), 
-                        'height': r['h'].get()
-                    }
-                    
-                    if monitor['width'] == 0 or monitor['height'] == 0: continue
-                    
-                    sct_img = self.sct.grab(monitor)
-                    img = Image.frombytes("RGB", sct_img.size, sct_img.bgra, "raw", "BGRX")
-                    captured_data.append((img, r['zoom'].get()))
-
-                if self.separate.get():
-                    for i, (img, z) in enumerate(captured_data):
-                        if i < len(self.mirror_windows):
-                            win, lbl = self.mirror_windows[i]
-                            new_size = (int(img.width * z), int(img.height * z))
-                            final_img = img.resize(new_size, Image.NEAREST)
-                            photo = ImageTk.PhotoImage(final_img)
-                            lbl.config(image=photo)
-                            lbl.image = photo
-                            win.geometry(f"{new_size[0]}x{new_size[1]}")
-                else:
-                    if captured_data:
-                        resized_images = []
-                        total_w = 0
-                        max_h = 0
-                        
-                        for img, z in captured_data:
-                            nw = int(img.width * z)
-                            nh = int(img.height * z)
-                            resized = img.resize((nw, nh), Image.NEAREST)
-                            resized_images.append(resized)
-                            total_w += nw + 10
-                            if nh > max_h: max_h = nh
-                        
-                        total_w -= 10
-                        
-                        combined = Image.new('RGB', (total_w, max_h), (0,0,0))
-                        current_x = 0
-                        for r_img in resized_images:
-                            combined.paste(r_img, (current_x, 0))
-                            current_x += r_img.width + 10
-                        
-                        win, lbl = self.mirror_windows[0]
-                        photo = ImageTk.PhotoImage(combined)
-                        lbl.config(image=photo)
-                        lbl.image = photo
-                        win.geometry(f"{total_w}x{max_h}")
-
+                self.pipeline.spec = spec
+                frame = self.pipeline.output.get()
+                if frame is not None:
+                    self.present_frame(frame)
+                    self.pipeline.instr.record("latency", frame.timestamp)
+                elif self.pending_buffers:
+                    self.present_pending()
             except Exception as e:
-                print(f"Error: {e}")
+                self.pipeline.instr.error("present", e)
+        events = self.pipeline.triggers.events
+        while events:
+            self.fire_alert(*events.popleft())
 
-        delay = int(1000 / max(1, self.fps.get()))
         if self.running_thread:
-            self.root.after(delay, self.update_mirror_loop)
+            delay = self.present_scheduler.next_delay()
+            self.root.after(int(delay * 1000), self.update_mirror_loop)
+
+    def present_frame(self, frame):
+        spec = self.current_spec()
+        if spec is None or frame.separate != spec.separate: return
+        self.pending_buffers |= frame.dirty
+        self.present_pending()
+        if not self.startup_done:
+            self.finish_startup("first frame")
+
+    def present_pending(self):
+        buffers = self.pipeline.buffers.buffers
+        for i in sorted(self.pending_buffers):
+            if i >= len(buffers) or i >= len(self.mirror_windows):
+                self.pending_buffers.discard(i)
+                continue
+            buf = buffers[i]
+            # never wait on the worker; a busy buffer is retried next tick
+            if not buf.lock.acquire(blocking=False): continue
+            t0 = self.pipeline.instr.clock()
+            try:
+                win, lbl = self.mirror_windows[i]
+                self.present_buffer(buf, win, lbl)
+            finally:
+                buf.lock.release()
+            self.pipeline.instr.record("photo", t0, i)
+            self.pending_buffers.discard(i)
+
+    def present_buffer(self, buf, win, lbl):
+        if buf.image is None: return
+        size = buf.image.size
+        if buf.photo is None or (buf.photo.width(), buf.photo.height()) != size:
+            buf.photo = ImageTk.PhotoImage(buf.image)
+            buf.label = None
+        else:
+            buf.photo.paste(buf.image)
+        if buf.label is not lbl:
+            lbl.config(image=buf.photo)
+            lbl.image = buf.photo
+            buf.label = lbl
+            buf.shown_size = None
+        if buf.shown_size != size:
+            win.geometry(f"{size[0]}x{size[1]}")
+            buf.shown_size = size
+
+    def update_status_loop(self):
+        q = self.pipeline.output
+        if self.pipeline.is_running():
+            skipped = self.pipeline.detector.skip_rate() * 100
+            ticks = max(1, self.pipeline.scheduler.ticks)
+            per_tick = self.pipeline.regions_captured / ticks
+            self.status_var.set(
+                f"Capture: {self.pipeline.scheduler.summary()}\n"
+                f"Frames: {q.produced}  Dropped: {q.dropped}  Skipped: {skipped:.0f}%  Regions/tick: {per_tick:.1f}\n"
+                f"Power: {self.pipeline.idle.summary()}"
+                + (f"\nLast alert: {self.last_alert}" if self.last_alert else "")
+                + (f"\n{self.hotkey_error}" if self.hotkey_error else "")
+            )
+        else:
+            self.status_var.set("Capture stopped" + (f"\n{self.hotkey_error}" if self.hotkey_error else ""))
+        if self.running_thread:
+            self.root.after(1000, self.update_status_loop)
+
+    def toggle_stats(self):
+        instr = self.pipeline.instr
+        if self.show_stats.get():
+            instr.enabled = True
+            self.stats_frame.pack(fill="x", pady=5)
+            self.update_stats_loop()
+        else:
+            instr.enabled = False
+            self.stats_frame.pack_forget()
+
+    def update_stats_loop(self):
+        if not self.show_stats.get(): return
+        names = {r.id: f"R{i+1}" for i, r in enumerate(self.regions)}
+        instr = self.pipeline.instr
+        lines = []
+        for stage, region, count, p50, p95, p99 in instr.percentiles():
+            if region is None:
+                label = stage
+            elif stage == "photo":
+                label = f"{stage} w{region + 1}"
+            else:
+                label = f"{stage} {names.get(region, region)}"
+            lines.append(f"{label:<14}{count:>5}  {p50:6.2f} {p95:6.2f} {p99:6.2f}")
+        if not lines:
+            lines.append("no samples yet (run or preview)")
+        lines.append(f"capture: {self.pipeline.scheduler.summary()}")
+        lines.append(f"power: {self.pipeline.idle.summary()}")
+        history = self.pipeline.history
+        if history.enabled:
+            lines.append(f"history: {history.nbytes / 2**20:.1f} / {history.budget / 2**20:.0f} MB, evicted {history.evicted}")
+        if self.pipeline.sink is not None:
+            lines.append(f"shared: {self.pipeline.sink.published} frames published")
+        triggers = self.pipeline.triggers
+        if triggers.rules:
+            lines.append(f"alerts: {triggers.rule_count()} rules, {triggers.evaluated} checks, {triggers.fired} fired")
+        pool = self.pipeline.pool
+        if pool is not None:
+            lines.append(f"multi-core: {pool.workers} workers, {pool.dispatched} ticks pooled, {pool.inline} in-process")
+        lines.append(f"errors: {instr.errors}" + (f"  last: {instr.last_error}" if instr.last_error else ""))
+        self.stats_var.set("\n".join(lines))
+        if self.running_thread:
+            self.root.after(500, self.update_stats_loop)
+
+    def export_stats(self):
+        path = filedialog.asksaveasfilename(
+            parent=self.root, defaultextension=".jsonl", initialfile="buffbarzoom_stats.jsonl",
+            filetypes=[("JSON Lines", "*.jsonl"), ("All files", "*.*")]
+        )
+        if not path: return
+        try:
+            count = self.pipeline.instr.export_jsonl(path)
+            self.status_var.set(f"Exported {count} samples to {os.path.basename(path)}")
+        except OSError as e:
+            self.pipeline.instr.error("export", e)
 
     def show_mirrors(self):
         for win, _ in self.mirror_windows:
@@ -447,18 +3330,28 @@ class BuffMirrorApp:
 
     def set_running(self):
         self.mode = "RUNNING"
+        self.update_overlay_visibility()
         self.root.withdraw()
         self.show_mirrors()
+        self.pipeline.start()
+        self.pipeline.wake()
 
     def set_setup(self):
+        self.build_setup_ui()
         self.mode = "SETUP"
+        self.update_overlay_visibility()
+        self.pipeline.stop()
         self.root.deiconify()
         self.hide_mirrors()
 
     def set_preview(self):
+        self.build_setup_ui()
         self.mode = "PREVIEW"
+        self.update_overlay_visibility()
         self.root.deiconify()
         self.show_mirrors()
+        self.pipeline.start()
+        self.pipeline.wake()
 
     def load_settings(self):
         if os.path.exists(SETTINGS_FILE):
@@ -473,30 +3366,61 @@ class BuffMirrorApp:
         data = {
             'fps': self.fps.get(),
             'separate': self.separate.get(),
+            'coalesce': self.coalesce.get(),
+            'skip_unchanged': self.skip_unchanged.get(),
+            'change_threshold': self.change_threshold.get(),
+            'change_step': self.pipeline.detector.sample_step,
+            'engine': "numpy" if self.use_numpy.get() else "pil",
             'monitor_idx': self.current_mon_idx,
             'key_run': self.active_keys['run'],
             'key_setup': self.active_keys['setup'],
             'key_preview': self.active_keys['preview'],
             'key_quit': self.active_keys['quit'],
-            'regions': []
+            'key_wake': self.active_keys['wake'],
+            'idle_backoff': self.idle_backoff.get(),
+            'idle_after': self.idle_after.get(),
+            'idle_floor_fps': self.idle_floor.get(),
+            'game_window': self.game_window.get().strip(),
+            'history': self.keep_history.get(),
+            'history_mb': self.history_mb.get(),
+            'history_seconds': self.history_seconds.get(),
+            'shared_output': self.shared_output.get(),
+            'multicore': self.multicore.get(),
+            'multicore_workers': self.multicore_workers,
+            'multicore_min_pixels': self.pipeline.pool_min_pixels,
+            'start_running': self.start_running.get(),
+            'regions': [r.to_dict() for r in self.regions],
+            'window_positions': self.window_positions
         }
-        for r in self.regions:
-            data['regions'].append({
-                'x': r['x'].get(),
-                'y': r['y'].get(),
-                'w': r['w'].get(),
-                'h': r['h'].get(),
-                'on': r['on'].get(),
-                'zoom': r['zoom'].get()
-            })
 
         with open(SETTINGS_FILE, 'w') as f:
             json.dump(data, f)
         
         self.running_thread = False
+        self.pipeline.stop()
+        self.pipeline.close()
         self.root.destroy()
         os._exit(0)
 
+def source_factory_from_arg(value):
+    if value == "mss":
+        return MssSource
+    if value == "synthetic":
+        return SyntheticSource
+    return lambda: ReplaySource(value)
+
+
 if __name__ == "__main__":
-    app = BuffMirrorApp()
+    if getattr(sys, "frozen", False):
+        # pool workers of the packaged app start here; freeze_support is a no-op otherwise
+        multiprocessing.freeze_support()
+    import argparse
+    parser = argparse.ArgumentParser(description="Buff Bar Zoom")
+    parser.add_argument("--source", default="mss", help="mss (screen), synthetic, or a replay file path")
+    parser.add_argument("--run", action="store_true", help="start in Run mode, mirrors only")
+    parser.add_argument("--profile-startup", action="store_true", help="print the time spent in each startup phase")
+    args = parser.parse_args()
+    profile = StartupProfile(args.profile_startup, STARTUP_T0)
+    profile.mark("imports")
+    app = BuffMirrorApp(source_factory_from_arg(args.source), args.run, profile)
     app.root.mainloop()
@@ -0,0 +1,73 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from BuffBarZoom import BatchedCapture, CAPTURE_CALL_COST_PX, source_factory_from_arg
+
+
+def make_layout(kind, count, mon, rng):
+    w, h = 50, 50
+    left, top = mon['left'], mon['top']
+    if kind == "row":
+        # a buff bar: icons side by side with a small gap
+        return [(left + 300 + i * (w + 4), top + 600, w, h) for i in range(count)]
+    if kind == "grid":
+        cols = 6
+        return [(left + 300 + (i % cols) * (w + 4), top + 400 + (i // cols) * (h + 4), w, h) for i in range(count)]
+    # scattered over the whole monitor
+    return [(left + rng.randrange(0, mon['width'] - w), top + rng.randrange(0, mon['height'] - h), w, h)
+            for _ in range(count)]
+
+
+def run_case(cap, rects, coalesce, frames, due=None):
+    # due: per-frame sets of wanted rect indices, as with mixed refresh rates
+    cap.get_plan(rects, coalesce)
+    calls_before = cap.grab_calls
+    start = time.perf_counter()
+    for n in range(frames):
+        for slc in cap.grab(rects, coalesce, due[n % len(due)] if due else None):
+            if slc is not None:
+                slc.to_image()
+    elapsed = time.perf_counter() - start
+    return elapsed / frames * 1000, (cap.grab_calls - calls_before) / frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-region vs coalesced screen capture")
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--counts", default="1,2,4,6,10,20")
+    parser.add_argument("--layouts", default="row,grid,scattered")
+    parser.add_argument("--call-cost", type=int, default=CAPTURE_CALL_COST_PX)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--source", default="mss", help="mss (screen), synthetic, or a replay file path")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    counts = [int(c) for c in args.counts.split(",")]
+
+    with source_factory_from_arg(args.source)() as source:
+        monitors = source.monitors[1:]
+        cap = BatchedCapture(source, monitors, args.call_cost)
+        print(f"call cost = {args.call_cost} px, {args.frames} frames per case")
+        print(f"{'layout':<10} {'regions':>7} {'per-region ms':>14} {'grabs':>6} {'coalesced ms':>13} {'grabs':>6} {'waste %':>8} {'speedup':>8} {'1/3 due ms':>11}")
+        for kind in args.layouts.split(","):
+            for count in counts:
+                rects = make_layout(kind, count, monitors[0], rng)
+                plan = cap.get_plan(rects, True)
+                used = sum(r[2] * r[3] for r in rects)
+                grabbed = sum(b[2] * b[3] for b, _ in plan)
+                waste = 100.0 * (grabbed - used) / grabbed if grabbed else 0.0
+
+                single_ms, single_calls = run_case(cap, rects, False, args.frames)
+                batch_ms, batch_calls = run_case(cap, rects, True, args.frames)
+                due = [{i for i in range(count) if rng.random() < 1 / 3} for _ in range(8)]
+                mixed_ms, _ = run_case(cap, rects, True, args.frames, due)
+                print(f"{kind:<10} {count:>7} {single_ms:>14.3f} {single_calls:>6.0f} {batch_ms:>13.3f} {batch_calls:>6.0f} {waste:>8.1f} {single_ms / batch_ms:>7.2f}x {mixed_ms:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from BuffBarZoom import CaptureSlice, FilterChain, np, zoomed_size
+
+try:
+    from PIL import ImageEnhance, ImageOps
+except ImportError:
+    ImageEnhance = None
+
+# Per-filter cost on one region's pre-zoom grab, for both engines. The PIL
+# column is LUT + point() on the converted RGB image, the NumPy column is the
+# LUT gather on the BGRA slice. "enhance" is the per-frame ImageEnhance /
+# ImageOps equivalent without a precomputed table, for comparison.
+
+FILTERS = [
+    ("contrast 1.5", (1.5, 1.0, False, 0)),
+    ("gamma 2.2", (1.0, 2.2, False, 0)),
+    ("grayscale", (1.0, 1.0, True, 0)),
+    ("threshold 128", (1.0, 1.0, False, 128)),
+    ("full chain", (1.5, 2.2, True, 128)),
+]
+
+
+def enhance(img, contrast, gamma, grayscale, threshold):
+    if grayscale:
+        img = ImageOps.grayscale(img)
+    if contrast != 1.0:
+        img = ImageEnhance.Contrast(img).enhance(contrast)
+    if gamma != 1.0:
+        img = img.point(lambda v: 255.0 * (v / 255.0) ** (1.0 / gamma))
+    if threshold:
+        img = img.point(lambda v: 255 if v >= threshold else 0)
+    return img.convert("RGB")
+
+
+def per_frame_us(fn, frames):
+    fn()
+    start = time.perf_counter()
+    for _ in range(frames):
+        fn()
+    return (time.perf_counter() - start) / frames * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-filter cost of the region filter chain")
+    parser.add_argument("--size", default="317x53", help="region size WxH before zoom")
+    parser.add_argument("--zoom", type=float, default=2.0, help="only used to report the saving vs filtering after zoom")
+    parser.add_argument("--frames", type=int, default=2000)
+    args = parser.parse_args()
+    width, height = [int(v) for v in args.size.split("x")]
+
+    rng = random.Random(0)
+    buf = bytearray(rng.getrandbits(8) for _ in range(width * height * 4))
+    slc = CaptureSlice(buf, 0, width * 4, width, height)
+    img = slc.to_image()
+
+    start = time.perf_counter()
+    for _ in range(100):
+        FilterChain(1.5, 2.2, True, 128)
+    build_us = (time.perf_counter() - start) / 100 * 1e6
+
+    zw, zh = zoomed_size(width, height, args.zoom)
+    print(f"{width}x{height} region ({width * height} px, {zw * zh} px after x{args.zoom:g} zoom), "
+          f"microseconds per frame, LUT build {build_us:.0f} us (once per change)")
+    header = f"{'filter':<15}{'pil lut':>10}"
+    if np is not None: header += f"{'numpy lut':>11}"
+    if ImageEnhance is not None: header += f"{'enhance':>10}"
+    print(header)
+    for label, key in FILTERS:
+        chain = FilterChain(*key)
+        row = f"{label:<15}{per_frame_us(lambda: chain.apply_image(img), args.frames):>10.1f}"
+        if np is not None:
+            row += f"{per_frame_us(lambda: chain.apply_slice(slc), args.frames):>11.1f}"
+        if ImageEnhance is not None:
+            row += f"{per_frame_us(lambda: enhance(img, *key), args.frames):>10.1f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
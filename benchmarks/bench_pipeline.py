@@ -0,0 +1,186 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from BuffBarZoom import CapturePipeline, PipelineSpec, RegionSpec, ReplaySource, SyntheticSource, np
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def rss_mb():
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 2**20
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:
+        return 0.0
+
+
+def percentile(values, q):
+    if not values: return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def make_spec(count, zoom, separate, fps, engine, monitor):
+    # a buff bar: 50x50 icons in a row with a small gap
+    regions = []
+    for i in range(count):
+        left = monitor['left'] + 200 + i * 54
+        regions.append(RegionSpec(i + 1, left, monitor['top'] + 600, 50, 50, zoom, 0, 0))
+    return PipelineSpec(tuple(regions), separate, True, fps, True, 0.0, engine)
+
+
+class Presenter(threading.Thread):
+    # stands in for the Tk side: copies every repainted buffer like
+    # PhotoImage.paste would and records grab-to-present latency
+    def __init__(self, pipeline):
+        super().__init__(daemon=True)
+        self.pipeline = pipeline
+        self.stop = threading.Event()
+        self.frames = 0
+        self.pixels = 0
+        self.latencies = []
+
+    def run(self):
+        buffers = self.pipeline.buffers
+        while not self.stop.is_set():
+            frame = self.pipeline.output.get()
+            if frame is None:
+                time.sleep(0.001)
+                continue
+            for i in frame.dirty:
+                if i >= len(buffers.buffers): continue
+                buf = buffers.buffers[i]
+                with buf.lock:
+                    if buf.image is None: continue
+                    buf.image.tobytes()
+                    self.pixels += buf.image.width * buf.image.height
+            self.latencies.append(time.perf_counter() - frame.timestamp)
+            self.frames += 1
+
+
+def run_case(source_factory, monitor, count, zoom, separate, fps, engine, duration):
+    pipeline = CapturePipeline([monitor], source_factory)
+    pipeline.instr.enabled = True
+    pipeline.idle.enabled = False
+    pipeline.spec = make_spec(count, zoom, separate, fps, engine, monitor)
+    presenter = Presenter(pipeline)
+
+    rss_before = rss_mb()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    presenter.start()
+    pipeline.start()
+    time.sleep(duration)
+    pipeline.stop()
+    presenter.stop.set()
+    presenter.join()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    ticks = [ms for (stage, _), samples in pipeline.instr.snapshot() if stage == "tick" for _, ms in samples]
+    latency = presenter.latencies
+    return {
+        'regions': count, 'zoom': zoom, 'separate': separate, 'fps': fps, 'engine': engine,
+        'capture_fps': round(pipeline.scheduler.achieved_fps(), 2),
+        'presented_fps': round(presenter.frames / wall, 2),
+        'mpx_per_s': round(presenter.pixels / wall / 1e6, 3),
+        'tick_p50_ms': round(percentile(ticks, 0.5) * 1000, 3),
+        'tick_p95_ms': round(percentile(ticks, 0.95) * 1000, 3),
+        'latency_p50_ms': round(percentile(latency, 0.5) * 1000, 3),
+        'latency_p95_ms': round(percentile(latency, 0.95) * 1000, 3),
+        'cpu_pct': round(100 * cpu / wall, 1),
+        'rss_mb': round(rss_mb(), 1),
+        'rss_delta_mb': round(rss_mb() - rss_before, 1),
+        'missed': pipeline.scheduler.dropped,
+    }
+
+
+def case_key(row):
+    return (row['regions'], row['zoom'], row['separate'], row['fps'], row['engine'])
+
+
+COLUMNS = [
+    ('regions', 7, ''), ('zoom', 5, '.1f'), ('separate', 8, ''), ('fps', 4, ''), ('engine', 6, ''),
+    ('capture_fps', 11, '.1f'), ('presented_fps', 13, '.1f'), ('mpx_per_s', 9, '.2f'),
+    ('tick_p95_ms', 11, '.3f'), ('latency_p95_ms', 14, '.3f'), ('cpu_pct', 7, '.1f'), ('rss_mb', 7, '.1f'),
+]
+COMPARED = ['capture_fps', 'mpx_per_s', 'tick_p95_ms', 'latency_p95_ms', 'cpu_pct', 'rss_mb']
+
+
+def print_row(row, baseline=None):
+    cells = []
+    for name, width, fmt in COLUMNS:
+        cells.append(f"{format(row[name], fmt):>{width}}")
+    line = " ".join(cells)
+    if baseline is not None:
+        deltas = []
+        for name in COMPARED:
+            old = baseline.get(name)
+            if old:
+                deltas.append(f"{name} {100.0 * (row[name] - old) / old:+.0f}%")
+        line += "  | " + ", ".join(deltas)
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless capture -> scale -> composite pipeline benchmark")
+    parser.add_argument("--source", default="synthetic", help="synthetic or a replay file path")
+    parser.add_argument("--pattern", default="bars", choices=SyntheticSource.PATTERNS)
+    parser.add_argument("--change-rate", type=float, default=5.0, help="synthetic frames per second")
+    parser.add_argument("--regions", default="1,4,10")
+    parser.add_argument("--zooms", default="1,2,3.5")
+    parser.add_argument("--separate", default="0,1")
+    parser.add_argument("--fps", default="30,60")
+    parser.add_argument("--engines", default="pil,numpy" if np is not None else "pil")
+    parser.add_argument("--duration", type=float, default=1.5, help="seconds per case")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", help="JSON results of an earlier run to diff against")
+    args = parser.parse_args()
+    if np is not None:
+        np.zeros(1)  # the app imports numpy on first use; keep that out of the first case
+
+    if args.source == "synthetic":
+        source_factory = lambda: SyntheticSource(args.change_rate, args.pattern)
+    else:
+        source_factory = lambda: ReplaySource(args.source)
+    with source_factory() as probe:
+        monitor = probe.monitors[1]
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = {case_key(row): row for row in json.load(f)['cases']}
+
+    grid = itertools.product(
+        [int(v) for v in args.regions.split(",")],
+        [float(v) for v in args.zooms.split(",")],
+        [v.strip() in ("1", "true", "on") for v in args.separate.split(",")],
+        [int(v) for v in args.fps.split(",")],
+        args.engines.split(","),
+    )
+    print(" ".join(f"{name:>{width}}" for name, width, _ in COLUMNS))
+    results = []
+    for count, zoom, separate, fps, engine in grid:
+        row = run_case(source_factory, monitor, count, zoom, separate, fps, engine, args.duration)
+        results.append(row)
+        print_row(row, baseline.get(case_key(row)) if baseline else None)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'source': args.source, 'duration': args.duration, 'cases': results}, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
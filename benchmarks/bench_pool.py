@@ -0,0 +1,81 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from BuffBarZoom import (BatchedCapture, CapturePipeline, PipelineSpec, RegionSpec, SyntheticSource,
+                         np, virtual_monitors, zoomed_size)
+
+# In-process NumPy scaling vs the ScalePool, per frame, on the combined
+# canvas. The crossover is the output size from which the pool is faster;
+# use it as `multicore_min_pixels` in Zoom_settings.json.
+
+
+def make_spec(count, zoom, width, height, separate):
+    regions = tuple(RegionSpec(i + 1, 20 + (i % 16) * (width + 4), 100 + (i // 16) * (height + 4),
+                               width, height, zoom, 0, 0) for i in range(count))
+    return PipelineSpec(regions, separate, True, 60, False, 0.0, "numpy")
+
+
+def time_render(pipeline, spec, present, frames):
+    sizes = [zoomed_size(r.width, r.height, r.zoom) for r, _ in present]
+    changed = {r.id for r in spec.regions}
+    pipeline.buffers.resize(len(present) if spec.separate else 1)
+    pipeline.sync_pool()
+    pipeline.render_numpy(spec, present, sizes, changed)  # allocate buffers, warm up workers
+    start = time.perf_counter()
+    for _ in range(frames):
+        pipeline.render_numpy(spec, present, sizes, changed)
+    return (time.perf_counter() - start) / frames * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process-pool scaling crossover")
+    parser.add_argument("--counts", default="1,2,4,8,16,32")
+    parser.add_argument("--zooms", default="2,3,4,5")
+    parser.add_argument("--size", default="50x50", help="region size WxH")
+    parser.add_argument("--workers", type=int, default=0, help="pool size, 0 = cpu count - 1")
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--separate", action="store_true")
+    args = parser.parse_args()
+    if np is None:
+        sys.exit("numpy is required")
+    width, height = [int(v) for v in args.size.split("x")]
+    workers = args.workers or max(1, (os.cpu_count() or 2) - 1)
+
+    monitor = virtual_monitors(1920, 1080)[1]
+    inline = CapturePipeline([monitor])
+    pooled = CapturePipeline([monitor])
+    pooled.pool_workers = workers
+    pooled.pool_min_pixels = 0
+
+    print(f"{width}x{height} regions, {workers} workers, {'separate' if args.separate else 'combined'}")
+    print(f"{'regions':>7}{'zoom':>6}{'out MP':>8}{'inline ms':>11}{'pool ms':>9}{'speedup':>9}")
+    crossover = None
+    try:
+        with SyntheticSource(change_rate=0, pattern="noise") as source:
+            capture = BatchedCapture(source, [monitor])
+            for count in [int(c) for c in args.counts.split(",")]:
+                for zoom in [float(z) for z in args.zooms.split(",")]:
+                    spec = make_spec(count, zoom, width, height, args.separate)
+                    rects = [(r.left, r.top, r.width, r.height) for r in spec.regions]
+                    present = list(zip(spec.regions, capture.grab(rects, True)))
+                    sizes = [zoomed_size(r.width, r.height, r.zoom) for r in spec.regions]
+                    mp = sum(sw * sh for sw, sh in sizes) / 1e6
+                    a = time_render(inline, spec, present, args.frames)
+                    b = time_render(pooled, spec, present, args.frames)
+                    if b < a and (crossover is None or mp < crossover):
+                        crossover = mp
+                    print(f"{count:>7}{zoom:>6.1f}{mp:>8.2f}{a:>11.2f}{b:>9.2f}{a / b:>8.2f}x")
+    finally:
+        pooled.close()
+    if crossover is None:
+        print("the pool was never faster here; keep Multi-core off")
+    else:
+        print(f"pool faster from about {crossover:.2f} MP per frame: multicore_min_pixels = {int(crossover * 1e6)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import argparse
+import os
+import sys
+import time
+import tkinter as tk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from BuffBarZoom import Region, RegionListView, RegionRow
+
+# Startup and scrolling cost of the region editor. Needs a display (Tk window).
+# The eager case packs one row per region like the editor used to.
+
+
+def make_regions(count):
+    return [Region(i + 1, {'x': 100 + (i % 10) * 60, 'y': 100 + (i // 10) * 60, 'w': 50, 'h': 50}) for i in range(count)]
+
+
+def noop(*args):
+    pass
+
+
+def make_root():
+    root = tk.Tk()
+    root.geometry("500x700")
+    frame = tk.Frame(root)
+    frame.pack(fill="both", expand=True)
+    return root, frame
+
+
+def eager(count):
+    root, frame = make_root()
+    start = time.perf_counter()
+    for i, region in enumerate(make_regions(count)):
+        row = RegionRow(frame, noop, noop, noop, (1920, 1080))
+        row.bind(region, i, False)
+        row.frame.pack(fill="x", pady=3, padx=2)
+    root.update()
+    elapsed = time.perf_counter() - start
+    root.destroy()
+    return elapsed * 1000, count, None
+
+
+def virtual(count, scroll_steps):
+    root, frame = make_root()
+    start = time.perf_counter()
+    regions = make_regions(count)
+    view = RegionListView(frame, regions, noop, noop, (1920, 1080))
+    view.reload()
+    root.update()
+    elapsed = time.perf_counter() - start
+
+    # scroll top to bottom in unit steps, rebinding rows as they come into view
+    steps = 0
+    start = time.perf_counter()
+    while steps < scroll_steps and view.top < view.total_height() - view.canvas.winfo_height():
+        view.yview('scroll', 1, 'units')
+        root.update_idletasks()
+        steps += 1
+    scroll_ms = (time.perf_counter() - start) / max(1, steps) * 1000
+    built = view.rows_built
+    root.destroy()
+    return elapsed * 1000, built, scroll_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Region editor startup: eager rows vs virtualized list")
+    parser.add_argument("--counts", default="10,40,100")
+    parser.add_argument("--scroll-steps", type=int, default=500)
+    parser.add_argument("--target-ms", type=float, default=None,
+                        help="optional absolute startup budget for the virtualized list at the largest count")
+    parser.add_argument("--skip-eager", action="store_true")
+    args = parser.parse_args()
+
+    # The virtualized list must come up faster than the eager rows it
+    # replaces, at a cost that does not grow with the region count.
+    print(f"{'regions':>7}{'mode':>9}{'startup ms':>12}{'rows built':>12}{'ms/scroll':>11}")
+    counts = [int(c) for c in args.counts.split(",")]
+    results = {}
+    for count in counts:
+        eager_ms = None
+        if not args.skip_eager:
+            eager_ms, built, _ = eager(count)
+            print(f"{count:>7}{'eager':>9}{eager_ms:>12.1f}{built:>12}{'-':>11}")
+        ms, built, scroll_ms = virtual(count, args.scroll_steps)
+        print(f"{count:>7}{'virtual':>9}{ms:>12.1f}{built:>12}{scroll_ms:>11.2f}")
+        results[count] = (eager_ms, ms)
+
+    count = max(counts)
+    eager_ms, ms = results[count]
+    failed = False
+    if eager_ms is not None:
+        ok = ms < eager_ms
+        failed |= not ok
+        print(f"{count} regions: virtual {ms:.1f} ms vs eager {eager_ms:.1f} ms "
+              f"({eager_ms / ms:.1f}x) -> {'ok' if ok else 'FAIL'}")
+    if args.target_ms is not None:
+        ok = ms <= args.target_ms
+        failed |= not ok
+        print(f"{count} regions ready in under {args.target_ms:g} ms -> {'ok' if ok else 'FAIL'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import argparse
+import os
+import sys
+import time
+import tkinter as tk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from BuffBarZoom import PipelineSpec, Region, RegionSpec, build_region_specs
+
+# Per-frame region bookkeeping in the present loop. A Tcl interpreter without
+# a Tk window is enough for the variables, so this runs headless.
+
+VAR_CLASSES = {bool: tk.BooleanVar, float: tk.DoubleVar, int: tk.IntVar}
+
+
+def make_data(count):
+    return [{'x': 100 + (i % 10) * 60, 'y': 100 + (i // 10) * 60, 'w': 50, 'h': 50,
+             'on': True, 'zoom': 2.0, 'fps': 0, 'priority': 0} for i in range(count)]
+
+
+class VarRegions:
+    # the old layout: one dict of Tk variables per region, read every frame
+    def __init__(self, tcl, data):
+        self.fps = tk.IntVar(master=tcl, value=30)
+        self.regions = []
+        for i, d in enumerate(data):
+            r = {key: VAR_CLASSES[Region.TYPES[key]](master=tcl, value=value) for key, value in d.items()}
+            r['id'] = i + 1
+            self.regions.append(r)
+
+    def frame(self):
+        regions = []
+        for r in self.regions:
+            if not r['on'].get(): continue
+            regions.append(RegionSpec(r['id'], r['x'].get(), r['y'].get(), r['w'].get(), r['h'].get(),
+                                      r['zoom'].get(), max(0, r['fps'].get()), r['priority'].get()))
+        return PipelineSpec(tuple(regions), False, True, max(1, self.fps.get()), True, 0.0, "pil")
+
+    def edit(self, i, value):
+        self.regions[i]['x'].set(value)
+
+
+class ModelRegions:
+    # Region models bound to Tk variables by traces; the frame reads a cached spec
+    def __init__(self, tcl, data):
+        self.fps = tk.IntVar(master=tcl, value=30)
+        self.fps.trace_add('write', self.invalidate)
+        self.regions = []
+        self.vars = []
+        for i, d in enumerate(data):
+            region = Region(i + 1, d)
+            bound = {}
+            for key, kind in Region.TYPES.items():
+                var = VAR_CLASSES[kind](master=tcl, value=getattr(region, key))
+                var.trace_add('write', lambda *args, region=region, key=key, var=var: self.on_var(region, key, var))
+                bound[key] = var
+            self.regions.append(region)
+            self.vars.append(bound)
+        self.spec = None
+        self.dirty = True
+
+    def invalidate(self, *args):
+        self.dirty = True
+
+    def on_var(self, region, key, var):
+        if region.set(key, var.get()):
+            self.dirty = True
+
+    def frame(self):
+        if self.dirty:
+            self.spec = PipelineSpec(build_region_specs(self.regions, 0, 0), False, True,
+                                     max(1, self.fps.get()), True, 0.0, "pil")
+            self.dirty = False
+        return self.spec
+
+    def edit(self, i, value):
+        self.vars[i]['x'].set(value)
+
+
+def run_case(model, frames, edit_every):
+    start = time.perf_counter()
+    for n in range(frames):
+        if edit_every and n % edit_every == 0:
+            model.edit(n % len(model.regions), 100 + n % 500)
+        model.frame()
+    return (time.perf_counter() - start) / frames * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-frame region bookkeeping: Tk variable reads vs cached snapshot")
+    parser.add_argument("--regions", type=int, default=50)
+    parser.add_argument("--frames", type=int, default=5000)
+    args = parser.parse_args()
+
+    tcl = tk.Tcl()
+    data = make_data(args.regions)
+    print(f"{args.regions} regions, {args.frames} frames, microseconds per frame")
+    print(f"{'scenario':<22}{'tk vars':>10}{'snapshot':>10}{'speedup':>9}")
+    # idle: nothing edited; dragging: a slider moves every frame
+    for label, edit_every in (("idle", 0), ("edit every 10 frames", 10), ("edit every frame", 1)):
+        old = run_case(VarRegions(tcl, data), args.frames, edit_every)
+        new = run_case(ModelRegions(tcl, data), args.frames, edit_every)
+        print(f"{label:<22}{old:>10.2f}{new:>10.2f}{old / new:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from BuffBarZoom import CaptureSlice, SharedFrameReader, SharedFrameSink
+
+# Shared-memory output throughput: one writer publishing a region's frames as
+# fast as it can (or at --fps) while N reader processes poll for new frames.
+
+PREFIX = "bbzbench"
+
+
+def percentile(values, q):
+    if not values: return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def reader_main(region_id, copy, stop, results):
+    reader = SharedFrameReader(region_id, PREFIX)
+    last = 0
+    frames = 0
+    skipped = 0
+    nbytes = 0
+    latencies = []
+    while not stop.is_set():
+        frame = reader.read(last, copy=copy)
+        if frame is None:
+            time.sleep(0.0002)
+            continue
+        seq, width, height, timestamp, pixels = frame
+        latencies.append(time.time() - timestamp)
+        if last:
+            skipped += seq - last - 1
+        last = seq
+        frames += 1
+        nbytes += len(pixels)
+        if not copy:
+            pixels.release()
+    reader.close()
+    results.put((frames, skipped, nbytes, percentile(latencies, 0.5), percentile(latencies, 0.95)))
+
+
+def run_case(width, height, readers, duration, fps, copy):
+    sink = SharedFrameSink(PREFIX)
+    buf = bytearray(width * height * 4)
+    sink.publish(1, CaptureSlice(buf, 0, width * 4, width, height))
+
+    stop = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=reader_main, args=(1, copy, stop, results)) for _ in range(readers)]
+    for p in procs:
+        p.start()
+    time.sleep(0.5)  # let the readers attach
+
+    published = 0
+    publish_time = 0.0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        buf[0] = published & 255
+        t0 = time.perf_counter()
+        sink.publish(1, CaptureSlice(buf, 0, width * 4, width, height))
+        publish_time += time.perf_counter() - t0
+        published += 1
+        if fps:
+            time.sleep(max(0.0, start + published / fps - time.perf_counter()))
+    wall = time.perf_counter() - start
+    stop.set()
+    rows = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    sink.close()
+    return published / wall, publish_time / published * 1e6, rows, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared-memory frame output with concurrent readers")
+    parser.add_argument("--size", default="200x50", help="region size WxH")
+    parser.add_argument("--readers", default="1,2,4")
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--fps", type=float, default=0, help="writer rate, 0 = as fast as possible")
+    parser.add_argument("--no-copy", action="store_true", help="readers use views instead of copying")
+    args = parser.parse_args()
+    width, height = [int(v) for v in args.size.split("x")]
+
+    print(f"{width}x{height} BGRA, writer {'unthrottled' if not args.fps else f'{args.fps:.0f} fps'}, "
+          f"readers {'view' if args.no_copy else 'copy'}")
+    print(f"{'readers':>7}{'writer fps':>12}{'publish us':>12}{'reader fps':>12}{'MB/s each':>11}"
+          f"{'skipped %':>11}{'lat p50 ms':>12}{'lat p95 ms':>12}")
+    for count in [int(c) for c in args.readers.split(",")]:
+        writer_fps, publish_us, rows, wall = run_case(width, height, count, args.duration, args.fps, not args.no_copy)
+        frames = sum(r[0] for r in rows) / count
+        skipped = sum(r[1] for r in rows) / count
+        mbps = sum(r[2] for r in rows) / count / wall / 2**20
+        p50 = max(r[3] for r in rows) * 1000
+        p95 = max(r[4] for r in rows) * 1000
+        seen = frames + skipped
+        print(f"{count:>7}{writer_fps:>12.0f}{publish_us:>12.1f}{frames / wall:>12.0f}{mbps:>11.1f}"
+              f"{100 * skipped / seen if seen else 0:>11.1f}{p50:>12.3f}{p95:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
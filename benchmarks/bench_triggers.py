@@ -0,0 +1,109 @@
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from BuffBarZoom import CaptureSlice, Signature, TriggerEngine, TriggerRule, encode_cells, np
+
+# Cost of alert rules on the capture thread: the signature (downsampled grab)
+# once per changed region, then each rule on it. The frame case changes every
+# region every frame, the worst case; unchanged regions cost nothing.
+#
+# Regions are buff bars: 40x40 icons of 8x8 colour blocks on a dark
+# background, shuffled between frames. --flat uses per-pixel noise instead,
+# which averages to flat grey in the signature so a template nearly matches
+# everywhere: the worst case for the template search.
+
+ICON = 40
+
+
+def make_icon(rng):
+    blocks = [[bytes((rng.randrange(256), rng.randrange(256), rng.randrange(256), 255))
+               for _ in range(ICON // 8)] for _ in range(ICON // 8)]
+    return [b"".join(row[x // 8] for x in range(ICON)) for row in blocks for _ in range(8)]
+
+
+def make_slice(width, height, rng, flat=False):
+    if flat:
+        buf = bytearray(rng.getrandbits(8) for _ in range(width * height * 4))
+        return CaptureSlice(buf, 0, width * 4, width, height)
+    buf = bytearray(b"\x14\x14\x14\xff" * (width * height))
+    top = max(0, (height - ICON) // 2)
+    for left in range(4, width - ICON + 1, ICON + 6):
+        for y, row in enumerate(make_icon(rng)[:height - top]):
+            start = ((top + y) * width + left) * 4
+            buf[start:start + ICON * 4] = row
+    return CaptureSlice(buf, 0, width * 4, width, height)
+
+
+def make_rule(kind, sig, width, height):
+    data = {'kind': kind, 'action': 'log', 'threshold': 0.1}
+    if kind == 'color':
+        data.update(color='#ff8000', tolerance=32)
+    else:
+        # an icon-sized snapshot, like a buff in the bar
+        data['rect'] = [4 + (ICON + 6) * 2, max(0, (height - ICON) // 2), min(width, ICON), min(height, ICON)]
+        data['snapshot'] = encode_cells(TriggerRule(data).snapshot_cells(sig))
+    return data
+
+
+def per_call_us(fn, count):
+    fn()
+    start = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Alert rule evaluation cost per frame")
+    parser.add_argument("--size", default="317x53", help="region size WxH")
+    parser.add_argument("--regions", type=int, default=2)
+    parser.add_argument("--rules", type=int, default=12, help="rules per region, kinds in turn")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=5, help="frame runs; the median is reported")
+    parser.add_argument("--target-ms", type=float, default=1.0, help="budget per frame for all rules")
+    parser.add_argument("--flat", action="store_true", help="noise regions, the template worst case")
+    args = parser.parse_args()
+    if np is None:
+        sys.exit("numpy is required")
+    width, height = [int(v) for v in args.size.split("x")]
+    rng = random.Random(0)
+
+    slc = make_slice(width, height, rng, args.flat)
+    sig = Signature(slc)
+    print(f"{width}x{height} region -> {sig.image.width}x{sig.image.height} signature, microseconds per call")
+    print(f"{'signature':<12}{per_call_us(lambda: Signature(slc), args.frames):>8.1f}  once per changed region")
+    print(f"{'+ planes':<12}{per_call_us(lambda: Signature(slc).planes(), args.frames):>8.1f}  with diff/color rules")
+    print(f"{'+ gray':<12}{per_call_us(lambda: Signature(slc).gray(), args.frames):>8.1f}  with template rules")
+    for kind in TriggerRule.KINDS:
+        rule = TriggerRule(make_rule(kind, sig, width, height))
+        print(f"{kind:<12}{per_call_us(lambda: rule.test(sig), args.frames):>8.1f}  per rule")
+
+    # whole frames: every region changes, every rule runs
+    engine = TriggerEngine()
+    # the first frame holds the snapshots, later ones are other bars
+    frames = [[make_slice(width, height, rng, args.flat) for _ in range(args.regions)] for _ in range(4)]
+    for rid in range(args.regions):
+        base = Signature(frames[0][rid])
+        engine.set_rules(rid, [make_rule(TriggerRule.KINDS[i % 3], base, width, height) for i in range(args.rules)])
+    runs = []
+    for _ in range(max(1, args.repeat)):
+        start = time.perf_counter()
+        for n in range(args.frames):
+            for rid, frame in enumerate(frames[n % len(frames)]):
+                engine.update(rid, frame)
+        runs.append((time.perf_counter() - start) / args.frames * 1000)
+    ms = statistics.median(runs)
+    rules = engine.rule_count()
+    print(f"{args.regions} regions x {args.rules} rules = {rules} rules: {ms:.3f} ms per frame "
+          f"(median of {len(runs)}, {min(runs):.3f}-{max(runs):.3f}), {ms * 1000 / rules:.1f} us per rule incl. signatures")
+    print(f"target: {rules} rules in under {args.target_ms:g} ms -> {'ok' if ms <= args.target_ms else 'over'}")
+
+
+if __name__ == "__main__":
+    main()
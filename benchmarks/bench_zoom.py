@@ -0,0 +1,65 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from BuffBarZoom import CapturePipeline, CaptureSlice, PipelineSpec, RegionSpec, np, zoomed_size
+
+
+def make_regions(count, width, height, zoom, rng):
+    # all regions live in one shared "grab" buffer, like a coalesced capture
+    stride_px = count * (width + 7)
+    buf = bytearray(rng.getrandbits(8) for _ in range(stride_px * height * 4))
+    present = []
+    for i in range(count):
+        spec = RegionSpec(i + 1, i * (width + 7), 0, width, height, zoom, 0, 0)
+        present.append((spec, CaptureSlice(buf, i * (width + 7) * 4, stride_px * 4, width, height)))
+    return present
+
+
+def time_render(pipeline, render, spec, present, sizes, changed, frames):
+    pipeline.buffers.resize(len(present) if spec.separate else 1)
+    render(spec, present, sizes, changed)
+    start = time.perf_counter()
+    for _ in range(frames):
+        render(spec, present, sizes, changed)
+    elapsed = (time.perf_counter() - start) / frames * 1000
+    return elapsed, [buf.image.convert("RGB") for buf in pipeline.buffers.buffers]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PIL vs NumPy nearest-neighbour zoom per frame")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--regions", type=int, default=4)
+    parser.add_argument("--size", default="317x53")
+    parser.add_argument("--zooms", default="1,1.5,2,2.5,3,3.5,4,4.5,5")
+    parser.add_argument("--separate", action="store_true")
+    args = parser.parse_args()
+
+    if np is None:
+        print("numpy is not installed")
+        return
+
+    width, height = (int(v) for v in args.size.split("x"))
+    rng = random.Random(1)
+    pipeline = CapturePipeline([])
+    print(f"{args.regions} regions of {width}x{height}, {'separate' if args.separate else 'combined'}, {args.frames} frames")
+    print(f"{'zoom':>5} {'out px':>10} {'pil ms':>8} {'numpy ms':>9} {'speedup':>8} {'identical':>10}")
+    for zoom in (float(z) for z in args.zooms.split(",")):
+        present = make_regions(args.regions, width, height, zoom, rng)
+        sizes = [zoomed_size(r.width, r.height, r.zoom) for r, _ in present]
+        changed = {r.id for r, _ in present}
+        spec = PipelineSpec(tuple(r for r, _ in present), args.separate, True, 60, False, 0.0, "pil")
+
+        pil_ms, pil_images = time_render(pipeline, pipeline.render_pil, spec, present, sizes, changed, args.frames)
+        np_ms, np_images = time_render(pipeline, pipeline.render_numpy, spec, present, sizes, changed, args.frames)
+        identical = all(a.tobytes() == b.tobytes() for a, b in zip(pil_images, np_images))
+        out_px = sum(w * h for w, h in sizes)
+        print(f"{zoom:>5.1f} {out_px:>10} {pil_ms:>8.3f} {np_ms:>9.3f} {pil_ms / np_ms:>7.2f}x {str(identical):>10}")
+
+
+if __name__ == "__main__":
+    main()